@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the DMX strobe controller (no hardware required).
+Measures the host-side cost of the DMX code paths using a null serial port,
+so the numbers show encoding overhead rather than USB throughput.
+"""
+
+import os
+import sys
+import time
+import timeit
+
+
+# Null serial port: accepts writes and discards them
+class NullSerial:
+    def __init__(self, port, baudrate, timeout):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+# Patch serial module so DMXUSB writes to the null port
+sys.modules['serial'] = type(sys)('serial')
+sys.modules['serial'].Serial = NullSerial
+sys.modules['serial'].SerialException = Exception
+
+import dmx_strobe
+
+
+def legacy_send_dmx(dmx, dmx_data):
+    """Original send_dmx: builds a fresh message from a list of ints on every call."""
+    data_length = len(dmx_data)
+    message = bytearray()
+    message.append(dmx.START_MSG)
+    message.append(dmx.SEND_DMX)
+    message.append(data_length & 0xFF)
+    message.append((data_length >> 8) & 0xFF)
+    message.extend(dmx_data)
+    message.append(dmx.END_MSG)
+    dmx.serial.write(message)
+
+
+def report(name, seconds, number):
+    """Print the per-call cost of a benchmark in microseconds."""
+    per_call_us = seconds / number * 1e6
+    print(f"{name:<40} {per_call_us:8.2f} us/frame")
+    return per_call_us
+
+
+def bench_send_dmx(number=20000):
+    """Compare the per-frame cost of the legacy and persistent-buffer encoders."""
+    print("\n--- send_dmx: per-frame encode + write ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/null')
+    for channel in range(1, 513):
+        dmx.set_channel(channel, channel % 256)
+
+    legacy_data = list(dmx.dmx_data)
+    before = report("legacy (fresh bytearray per frame)",
+                    timeit.timeit(lambda: legacy_send_dmx(dmx, legacy_data), number=number), number)
+    after = report("persistent packet buffer",
+                   timeit.timeit(dmx.send_dmx, number=number), number)
+    print(f"speedup: {before / after:.1f}x")
+
+
+def bench_snapshots(number=20000):
+    """Compare rebuilding strobe looks through fixture calls with sending pre-encoded snapshots."""
+    print("\n--- Alternating white/blackout frames ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/null')
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+
+    def rebuilt_frame():
+        par.white_full()
+        dmx.send_dmx()
+        par.blackout()
+        dmx.send_dmx()
+
+    par.white_full()
+    dmx.define_snapshot('white')
+
+    def snapshot_frame():
+        dmx.send_snapshot('white')
+        dmx.blackout()
+
+    before = report("fixture calls + send_dmx()", timeit.timeit(rebuilt_frame, number=number) / 2, number)
+    after = report("send_snapshot()", timeit.timeit(snapshot_frame, number=number) / 2, number)
+    print(f"speedup: {before / after:.1f}x")
+
+
+def bench_bulk_channels(number=2000):
+    """Compare per-channel writes with batch writes for a pixel-mapped universe."""
+    print("\n--- 510 channel writes (170 RGB pixels) ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/null')
+    values = [channel % 256 for channel in range(510)]
+    channels = list(range(1, 511))
+
+    def per_channel():
+        for channel, value in zip(channels, values):
+            dmx.set_channel(channel, value)
+
+    report("set_channel per value", timeit.timeit(per_channel, number=number), number)
+    report("set_channels(1, values)",
+           timeit.timeit(lambda: dmx.set_channels(1, values), number=number), number)
+    report("set_channels_at(channels, values)",
+           timeit.timeit(lambda: dmx.set_channels_at(channels, values), number=number), number)
+
+
+def bench_universe_memory():
+    """Compare the memory footprint of list-backed and bytearray-backed universes."""
+    print("\n--- Universe storage footprint ---")
+    legacy = [channel % 256 for channel in range(512)]
+    # Small ints are cached by CPython, so only the list itself is counted
+    legacy_size = sys.getsizeof(legacy)
+    dmx = dmx_strobe.DMXUSB(port='/dev/null')
+    compact_size = sys.getsizeof(dmx.dmx_data)
+    print(f"{'list of ints':<40} {legacy_size:8d} bytes")
+    print(f"{'bytearray':<40} {compact_size:8d} bytes")
+
+
+def bench_emulator(duration=2.0):
+    """Drive the PTY widget emulator end to end: raw writes, simulated 250 kbaud line."""
+    import enttec_emulator
+    print("\n--- End to end through the PTY widget emulator ---")
+    for rate in (44, 200):
+        emulator = enttec_emulator.EnttecEmulator()
+        emulator.start()
+        fd = os.open(emulator.port, os.O_RDWR | os.O_NOCTTY)
+        dmx = dmx_strobe.DMXUSB(port='/dev/null')
+        dmx.enable_raw_write(fd=fd)
+        par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+        
+        dmx.start_output(rate=rate)
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            par.set_rgb(255, 0, 0)
+            dmx.send_dmx()
+            time.sleep(0.01)
+        dmx.stop_output()
+        time.sleep(0.1)  # let the emulator decode the last frames
+        emulator.stop()
+        
+        stats = emulator.stats()
+        jitter = stats['jitter'] * 1e3 if stats['jitter'] is not None else float('nan')
+        print(f"{f'output thread at {rate} fps':<40} {stats['fps']:8.1f} fps on the line, "
+              f"jitter {jitter:.3f}ms, {stats['dropped']} dropped, "
+              f"write {dmx.write_stats.mean * 1e6:.1f} us")
+        dmx.close()
+        os.close(fd)
+        emulator.close()
+
+
+def main():
+    """Run all benchmarks."""
+    print("=" * 60)
+    print("DMX Strobe Controller - Benchmarks")
+    print("=" * 60)
+
+    bench_send_dmx()
+    bench_universe_memory()
+    bench_snapshots()
+    bench_bulk_channels()
+    bench_emulator()
+
+
+if __name__ == "__main__":
+    main()
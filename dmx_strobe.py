@@ -6,85 +6,2728 @@ Uses AVT DMX512 USB Controller on Raspberry Pi
 This script creates an 8Hz white strobe effect on a BeamZ LED Par light.
 """
 
+import asyncio
+import copy
+import heapq
+import json
+import os
+import select
 import serial
+import socket
+import threading
 import time
 import sys
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-class DMXUSB:
+try:
+    import numpy
+except ImportError:  # optional: only needed to pass NumPy arrays to set_channels
+    numpy = None
+
+# DMX512 line timing (microseconds) at 250 kbaud: each slot is 11 bits of 4 us
+DMX_START_CODE = 0x00
+DMX_SLOT_US = 44
+DMX_BREAK_US = 176
+DMX_MAB_US = 12
+DMX_MIN_SLOTS = 24
+
+
+def dmx_max_frame_rate(slots, break_us=DMX_BREAK_US, mab_us=DMX_MAB_US):
+    """
+    Calculate the maximum DMX refresh rate for a given frame length.
+    
+    A frame on the wire is break + mark-after-break + start code + data slots.
+    
+    Args:
+        slots: Number of channel slots in the frame (24-512)
+        break_us: Break time in microseconds (default: 176)
+        mab_us: Mark-after-break time in microseconds (default: 12)
+    
+    Returns:
+        Maximum frames per second
+    """
+    frame_us = break_us + mab_us + (1 + slots) * DMX_SLOT_US
+    return 1e6 / frame_us
+
+
+def _to_dmx_bytes(values):
+    """
+    Convert a batch of channel values to bytes, clamping to 0-255.
+    
+    Accepts sequences of ints, bytes-like objects (already in range) and
+    NumPy arrays. Values that are all in range take a single C-level
+    conversion; only out-of-range batches are clamped value by value.
+    Scalars and other non-sequences raise TypeError.
+    """
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return values
+    # bytes(5) would be five zero bytes, not the value 5
+    if isinstance(values, (int, str)) or not hasattr(values, '__len__'):
+        raise TypeError(f"Channel values must be a sequence, got {type(values).__name__}")
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return numpy.clip(values, 0, 255).astype(numpy.uint8).tobytes()
+    try:
+        return bytes(values)
+    except ValueError:
+        return bytes([max(0, min(255, value)) for value in values])
+
+
+class TimingStats:
+    """
+    Running statistics for a repeated duration (write times, lateness, ...).
+    All values are in seconds.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Clear all recorded samples."""
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+    
+    def add(self, seconds):
+        """Record one sample."""
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+    
+    @property
+    def mean(self):
+        """Mean of all samples (None if there are none)."""
+        return self.total / self.count if self.count else None
+    
+    def as_dict(self):
+        """Statistics as a plain dict."""
+        return {'count': self.count, 'mean': self.mean, 'min': self.min,
+                'max': self.max, 'last': self.last}
+    
+    def __str__(self):
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} mean={self.mean * 1e3:.3f}ms "
+                f"min={self.min * 1e3:.3f}ms max={self.max * 1e3:.3f}ms")
+
+
+class DeadlineScheduler:
+    """
+    Runs a timed loop on absolute deadlines instead of relative sleeps.
+    
+    Every deadline is computed from the start time, so the time spent
+    building and writing frames never accumulates as drift. Deadlines are
+    kept in perf_counter nanoseconds.
+    """
+    
+    def __init__(self, period=None, spin=0.0, stop_event=None):
+        """
+        Initialize the scheduler and start its clock.
+        
+        Args:
+            period: Seconds between ticks for wait_next() (default: None)
+            spin: Sleep until this many seconds before each deadline, then
+                busy-wait the rest for sub-millisecond precision (default: 0.0)
+            stop_event: Optional threading.Event that interrupts waiting
+        """
+        self.period_ns = round(period * 1e9) if period is not None else None
+        self.spin_ns = round(spin * 1e9)
+        self.stop_event = stop_event
+        
+        # Overrun statistics: a deadline that had already passed when waited for
+        self.lateness = TimingStats()
+        self.overruns = 0
+        self.skipped = 0
+        self.start()
+    
+    def start(self):
+        """(Re)start the clock; deadlines are measured from now."""
+        self.start_ns = time.perf_counter_ns()
+        self.next_ns = self.start_ns
+    
+    @property
+    def elapsed(self):
+        """Seconds since start()."""
+        return (time.perf_counter_ns() - self.start_ns) / 1e9
+    
+    def wait_next(self):
+        """
+        Wait for the next periodic tick.
+        
+        If the loop fell more than a whole period behind, the missed ticks are
+        skipped (and counted) rather than sent back to back.
+        
+        Returns:
+            False if stop_event was set while waiting, True otherwise
+        """
+        self.next_ns += self.period_ns
+        behind = time.perf_counter_ns() - self.next_ns
+        if behind >= self.period_ns:
+            missed = behind // self.period_ns
+            self.skipped += missed
+            self.next_ns += missed * self.period_ns
+        return self._wait_ns(self.next_ns)
+    
+    def wait_until(self, offset):
+        """
+        Wait until a deadline given in seconds since start().
+        
+        Returns:
+            False if stop_event was set while waiting, True otherwise
+        """
+        return self._wait_ns(self.start_ns + round(offset * 1e9))
+    
+    def _wait_ns(self, deadline_ns):
+        """Sleep (then optionally spin) until an absolute perf_counter_ns deadline."""
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining < 0:
+            self.overruns += 1
+            self.lateness.add(-remaining / 1e9)
+            return not (self.stop_event and self.stop_event.is_set())
+        
+        sleep_ns = remaining - self.spin_ns
+        if sleep_ns > 0:
+            if self.stop_event is not None:
+                if self.stop_event.wait(sleep_ns / 1e9):
+                    return False
+            else:
+                time.sleep(sleep_ns / 1e9)
+        while time.perf_counter_ns() < deadline_ns:
+            pass
+        
+        self.lateness.add((time.perf_counter_ns() - deadline_ns) / 1e9)
+        return not (self.stop_event and self.stop_event.is_set())
+    
+    def stats(self):
+        """Overrun statistics as a plain dict."""
+        return {'overruns': self.overruns, 'skipped': self.skipped,
+                'lateness': self.lateness.as_dict()}
+
+
+class DMXOutput:
+    """
+    Common interface for DMX outputs: one 512-channel universe plus the
+    machinery to send it (change tracking, trimming, pre-encoded snapshots,
+    frame transactions and the background output thread).
+    
+    Backends build their protocol's packet around the channel data by
+    implementing _encode(), _write_packet() and _close(); _encode() fills a
+    persistent buffer, self._packet (viewed through self._packet_view). Fixtures and
+    effects only use the public methods, so they drive any backend unchanged.
+    """
+    
+    UNIVERSE_SIZE = 512
+    _ZEROS = bytes(UNIVERSE_SIZE)
+    
+    # Background output refresh rate (frames per second)
+    DEFAULT_OUTPUT_RATE = 44
+    
+    # Fixtures hold their last frame, but many drop to a fail-safe state if no
+    # DMX arrives for about a second, so unchanged frames are still resent this often
+    DEFAULT_KEEPALIVE = 0.8
+    
+    def __init__(self, send_on_change=False, keepalive=DEFAULT_KEEPALIVE, trim=False):
+        """
+        Initialize the universe. Backends set up their packet buffer first.
+        
+        Args:
+            send_on_change: Skip frames identical to the last one sent (default: False)
+            keepalive: With send_on_change, resend an unchanged frame after this
+                many seconds so fixtures don't time out (default: 0.8)
+            trim: Send only up to the highest used or patched channel instead of
+                all 512 (default: False)
+        """
+        # DMX universe - 512 channels (all initialized to 0)
+        # One byte per channel, updated in place. Slices read and write like a list,
+        # and the memoryview export pins the size so a slice write can't resize it.
+        self.dmx_data = bytearray(self.UNIVERSE_SIZE)
+        self._dmx_view = memoryview(self.dmx_data)
+        
+        # Frame trimming: highest channel written through set_channel or patched
+        self.trim = trim
+        self._highest_channel = 0
+        
+        # DMX line timing assumed for refresh-rate calculations
+        self.break_us = DMX_BREAK_US
+        self.mab_us = DMX_MAB_US
+        
+        # Double buffering for the background output thread: callers write the
+        # back buffer (dmx_data), commit() copies it to the front buffer under the
+        # lock, and the output thread only ever sends the front buffer.
+        self._front = bytearray(self.UNIVERSE_SIZE)
+        self._lock = threading.Lock()
+        self._output_thread = None
+        self._output_stop = threading.Event()
+        self.output_scheduler = None
+        
+        # Change tracking: the last frame written, compared against each new frame
+        self.send_on_change = send_on_change
+        self.keepalive = keepalive
+        self._last_sent = bytearray(self.UNIVERSE_SIZE)
+        self._last_send_time = float('-inf')
+        self.frames_sent = 0
+        self.frames_suppressed = 0
+        
+        # Frame transactions: sends are deferred while any frame() is open
+        self._frame_depth = 0
+        self._frame_lock = threading.Lock()
+        
+        # Named snapshots, encoded once when defined
+        self._snapshots = {}
+        self.define_snapshot('blackout', self._ZEROS)
+    
+    def set_channel(self, channel, value):
+        """
+        Set a DMX channel value.
+        
+        Args:
+            channel: DMX channel (1-512)
+            value: Channel value (0-255)
+        """
+        if 1 <= channel <= 512:
+            self.dmx_data[channel - 1] = max(0, min(255, value))
+            if channel > self._highest_channel:
+                self._highest_channel = channel
+        else:
+            raise ValueError(f"Channel {channel} out of range (1-512)")
+    
+    def set_channels(self, start_channel, values):
+        """
+        Set consecutive DMX channels in one batch.
+        
+        Args:
+            start_channel: First DMX channel (1-512)
+            values: Channel values (sequence of ints, bytes or NumPy array);
+                clamped to 0-255 like set_channel()
+        """
+        data = _to_dmx_bytes(values)
+        last_channel = start_channel + len(data) - 1
+        if start_channel < 1 or last_channel > 512:
+            raise ValueError(f"Channels {start_channel}-{last_channel} out of range (1-512)")
+        self.dmx_data[start_channel - 1:last_channel] = data
+        if last_channel > self._highest_channel:
+            self._highest_channel = last_channel
+    
+    def set_channels_at(self, channels, values):
+        """
+        Set scattered DMX channels in one batch.
+        
+        Args:
+            channels: DMX channels (1-512), sequence or NumPy array
+            values: Channel values, one per channel; clamped to 0-255
+        """
+        if len(channels) != len(values):
+            raise ValueError(f"Got {len(channels)} channels but {len(values)} values")
+        if not len(channels):
+            return
+        lowest, highest = min(channels), max(channels)
+        if lowest < 1 or highest > 512:
+            raise ValueError(f"Channels {lowest}-{highest} out of range (1-512)")
+        
+        data = _to_dmx_bytes(values)
+        if numpy is not None and isinstance(channels, numpy.ndarray):
+            numpy.frombuffer(self.dmx_data, dtype=numpy.uint8)[channels - 1] = \
+                numpy.frombuffer(data, dtype=numpy.uint8)
+        else:
+            dmx_data = self.dmx_data
+            for channel, value in zip(channels, data):
+                dmx_data[channel - 1] = value
+        if highest > self._highest_channel:
+            self._highest_channel = int(highest)
+    
+    def patch(self, start_channel, count):
+        """
+        Register the channels used by a fixture, so trimmed frames include them.
+        
+        Args:
+            start_channel: First DMX channel of the fixture (1-512)
+            count: Number of channels the fixture uses
+        """
+        last_channel = start_channel + count - 1
+        if start_channel < 1 or last_channel > 512:
+            raise ValueError(f"Channels {start_channel}-{last_channel} out of range (1-512)")
+        if last_channel > self._highest_channel:
+            self._highest_channel = last_channel
+    
+    @property
+    def frame_slots(self):
+        """Number of channel slots in each frame sent (512 unless trimming)."""
+        if self.trim:
+            return max(DMX_MIN_SLOTS, self._highest_channel)
+        return self.UNIVERSE_SIZE
+    
+    def max_frame_rate(self):
+        """Maximum achievable frames per second for the current frame length and break timing."""
+        return dmx_max_frame_rate(self.frame_slots, self.break_us, self.mab_us)
+    
+    def send_dmx(self):
+        """
+        Send current DMX data to the output.
+        
+        While the background output thread is running, this commits the
+        current data instead; the thread puts it on the wire at the next tick.
+        
+        Inside a frame() transaction nothing is sent; the transaction sends
+        once when it ends.
+        
+        Returns:
+            True if a frame was written, False if it was deferred, committed to
+            the output thread or suppressed as unchanged (send_on_change)
+        """
+        if self._frame_depth:
+            return False
+        if self.output_running:
+            self.commit()
+            return False
+        packet = self._load_frame(self.dmx_data)
+        if packet is None:
+            return False
+        self._write_packet(packet)
+        return True
+    
+    def _load_frame(self, data):
+        """
+        Encode channel data into a packet if it should be sent.
+        
+        Returns:
+            The persistent packet, or None when send_on_change is set, the data
+            matches the last frame sent and the keepalive interval hasn't
+            elapsed yet
+        """
+        if self._suppress(data):
+            return None
+        return self._encode(data)
+    
+    def _suppress(self, data):
+        """
+        Change tracking for send_on_change.
+        
+        Returns True (and counts the frame as suppressed) if data matches the
+        last frame sent and the keepalive interval hasn't elapsed; otherwise
+        records data as the last frame sent and returns False.
+        """
+        if not self.send_on_change:
+            return False
+        now = time.monotonic()
+        if data == self._last_sent and now - self._last_send_time < self.keepalive:
+            self.frames_suppressed += 1
+            return True
+        self._last_send_time = now
+        self._last_sent[:] = data
+        return False
+    
+    async def send_dmx_async(self):
+        """
+        Coroutine version of send_dmx(), with the same rules.
+        
+        Returns:
+            True if the frame was written, False if it wasn't (deferred,
+            committed, suppressed, or dropped by the backend)
+        """
+        if self._frame_depth:
+            return False
+        if self.output_running:
+            self.commit()
+            return False
+        packet = self._load_frame(self.dmx_data)
+        if packet is None:
+            return False
+        return await self._write_packet_async(packet)
+    
+    async def _write_packet_async(self, packet):
+        """
+        Write an encoded packet without blocking the event loop; returns
+        whether it was written. Backends whose writes can block override
+        this; the default writes synchronously.
+        """
+        self._write_packet(packet)
+        return True
+    
+    def _encode(self, data):
+        """Encode channel data (up to frame_slots) into a packet; returns the packet."""
+        raise NotImplementedError
+    
+    def _write_packet(self, packet):
+        """Write an encoded packet to the output and count it in frames_sent."""
+        raise NotImplementedError
+    
+    def _resend(self):
+        """Put the current state back on the wire (e.g. after a reconnect)."""
+        self._last_send_time = float('-inf')  # so send_on_change doesn't suppress it
+        if self.output_running or self._frame_depth:
+            return  # the output thread or the open frame() sends it
+        self._write_packet(self._encode(self.dmx_data))
+    
+    def define_snapshot(self, name, data=None):
+        """
+        Store a named universe state, encoded once up front.
+        
+        Args:
+            name: Snapshot name
+            data: 512 channel values (default: the current universe)
+        """
+        data = bytes(self.dmx_data if data is None else data)
+        if len(data) != self.UNIVERSE_SIZE:
+            raise ValueError(f"Snapshot must have {self.UNIVERSE_SIZE} channels, got {len(data)}")
+        slots = self.frame_slots
+        self._snapshots[name] = (data, slots, self._encode_detached(data))
+    
+    def _encode_detached(self, data):
+        """
+        Encode data into a packet of its own, leaving the persistent buffer
+        alone: the output thread may be writing from it right now.
+        """
+        scratch = copy.copy(self)
+        scratch._packet = bytearray(self._packet)
+        scratch._packet_view = memoryview(scratch._packet)
+        scratch._frame_slots = None  # rewrite length fields in the copy
+        return bytes(scratch._encode(data))
+    
+    def send_snapshot(self, name):
+        """
+        Load a named snapshot into the universe and send its pre-encoded packet.
+        
+        Returns:
+            True if a frame was written (see send_dmx())
+        """
+        data, slots, packet = self._snapshots[name]
+        self.dmx_data[:] = data
+        if self._frame_depth:
+            return False
+        if self.output_running:
+            self.commit()
+            return False
+        if slots != self.frame_slots:
+            # Frame length changed since the snapshot was defined
+            self.define_snapshot(name, data)
+            data, slots, packet = self._snapshots[name]
+        if self._suppress(self.dmx_data):
+            return False
+        self._write_packet(packet)
+        return True
+    
+    @contextmanager
+    def frame(self):
+        """
+        Group channel writes into one atomically published frame.
+        
+        Sends (including send_dmx() calls made by effects, from any thread)
+        are deferred until the outermost frame() exits, which then sends or
+        commits exactly once, so the output never shows a half-written frame:
+        
+            with dmx.frame():
+                par.set_dimmer(255)
+                par.set_rgb(255, 0, 0)
+        
+        If the block raises, nothing is sent.
+        """
+        with self._frame_lock:
+            self._frame_depth += 1
+        try:
+            yield self
+        finally:
+            with self._frame_lock:
+                self._frame_depth -= 1
+                outermost = self._frame_depth == 0
+        if outermost:
+            self.send_dmx()
+    
+    def commit(self):
+        """Atomically publish the current DMX data to the output thread's front buffer."""
+        with self._lock:
+            self._front[:] = self._dmx_view
+    
+    @property
+    def output_running(self):
+        """True while the background output thread is sending frames."""
+        return self._output_thread is not None
+    
+    def start_output(self, rate=DEFAULT_OUTPUT_RATE, spin=0.0):
+        """
+        Start sending the front buffer at a fixed rate from a background thread.
+        
+        Effect code keeps writing channels and calling send_dmx() (or commit());
+        the line refresh stays steady no matter how slow the effect code is.
+        
+        Args:
+            rate: Frames per second (default: 44, the DMX maximum for 512 channels)
+            spin: Busy-wait this many seconds before each frame for tighter
+                timing, see DeadlineScheduler (default: 0.0)
+        """
+        if rate <= 0:
+            raise ValueError(f"Output rate must be positive, got {rate}")
+        if self.output_running:
+            raise RuntimeError("Output thread is already running")
+        
+        self.commit()
+        self._output_stop.clear()
+        self._output_thread = threading.Thread(
+            target=self._output_loop, args=(1.0 / rate, spin),
+            name="dmx-output", daemon=True)
+        self._output_thread.start()
+    
+    def stop_output(self):
+        """Stop the background output thread (no-op if it isn't running)."""
+        if not self.output_running:
+            return
+        self._output_stop.set()
+        self._output_thread.join()
+        self._output_thread = None
+    
+    def _output_loop(self, period, spin=0.0):
+        """Send the front buffer every period seconds until stopped."""
+        self.output_scheduler = DeadlineScheduler(period, spin=spin, stop_event=self._output_stop)
+        while True:
+            # Copy under the lock so a commit never lands mid-frame, but write
+            # outside it so committing never blocks on serial I/O
+            with self._lock:
+                packet = self._load_frame(self._front)
+            if packet is not None:
+                self._write_packet(packet)
+            if not self.output_scheduler.wait_next():
+                break
+    
+    def blackout(self):
+        """Turn off all channels."""
+        self.send_snapshot('blackout')
+    
+    def close(self):
+        """Stop output, black out and close the output."""
+        self.stop_output()
+        self.blackout()
+        self._close()
+    
+    def _close(self):
+        """Release the backend's resources."""
+
+
+class _EnttecPacketBuffer:
+    """
+    Pre-sized Enttec "send DMX" packet for DMXOutput backends; the label
+    picks the message (port 1, port 2). Mix in before DMXOutput.
+    """
+    
+    # Enttec message framing
+    START_MSG = 0x7E
+    END_MSG = 0xE7
+    
+    # Packet layout: 4 header bytes, DMX start code, DMX data, 1 trailer byte
+    HEADER_SIZE = 4
+    
+    def _init_packet(self, label):
+        """
+        Build the packet buffer:
+        START_MSG | label | Length_LSB | Length_MSB | Start_Code | DMX_Data | END_MSG
+        
+        Header and trailer only change with the frame length, so a send
+        normally just refreshes the data bytes.
+        """
+        self._data_start = self.HEADER_SIZE + 1
+        self._packet = bytearray(self._data_start + DMXOutput.UNIVERSE_SIZE + 1)
+        self._packet[0] = self.START_MSG
+        self._packet[1] = label
+        self._packet[self.HEADER_SIZE] = DMX_START_CODE
+        self._packet_view = memoryview(self._packet)
+        self._frame_slots = None
+        self._set_frame_slots(DMXOutput.UNIVERSE_SIZE)
+    
+    def _set_frame_slots(self, slots):
+        """Rewrite the packet length field and trailer for a new frame length."""
+        data_end = self._data_start + slots
+        length = slots + 1  # the start code counts towards the payload length
+        self._packet[2] = length & 0xFF
+        self._packet[3] = (length >> 8) & 0xFF
+        self._packet[data_end] = self.END_MSG
+        self._frame_view = self._packet_view[:data_end + 1]
+        self._frame_slots = slots
+    
+    def _encode(self, data):
+        """Copy channel data into the persistent packet and return a view of the frame."""
+        slots = self.frame_slots
+        if slots != self._frame_slots:
+            self._set_frame_slots(slots)
+        if slots == self.UNIVERSE_SIZE:
+            self._packet[self._data_start:self._data_start + slots] = data
+        else:
+            self._packet[self._data_start:self._data_start + slots] = data[:slots]
+        return self._frame_view
+
+
+class DMXUSB(_EnttecPacketBuffer, DMXOutput):
+    """
+    Driver for AVT DMX512 USB controller.
+    Uses Enttec DMX USB Pro protocol.
+    """
+    
+    # Enttec DMX USB Pro labels (message framing: see _EnttecPacketBuffer)
+    SEND_DMX = 0x06
+    GET_WIDGET_PARAMS = 0x03
+    SET_WIDGET_PARAMS = 0x04
+    GET_WIDGET_SERIAL = 0x0A
+    RECEIVED_DMX = 0x05
+    RECEIVE_DMX_ON_CHANGE = 0x08
+    RECEIVED_DMX_CHANGE = 0x09
+    
+    # Widget break and mark-after-break times are set in units of 10.67 us
+    WIDGET_TIME_UNIT_US = 10.67
+    
+    # FTDI adapters buffer up to 16 ms before sending a short USB transfer;
+    # 1 ms is the lowest latency timer the driver accepts
+    FTDI_LATENCY_TIMER_MS = 1
+    ASYNC_LOW_LATENCY = 1 << 13
+    
+    # Reconnect backoff: first retry delay, doubled after each failure up to the maximum
+    RECONNECT_DELAY = 0.1
+    RECONNECT_MAX_DELAY = 5.0
+    
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, low_latency=False,
+                 raw_write=False, reconnect=False, reconnect_delay=RECONNECT_DELAY,
+                 reconnect_max_delay=RECONNECT_MAX_DELAY, **kwargs):
+        """
+        Initialize DMX USB controller.
+        
+        Args:
+            port: Serial port path (default: /dev/ttyUSB0)
+            baudrate: Communication speed (default: 115200)
+            low_latency: Lower the FTDI latency timer and set ASYNC_LOW_LATENCY
+                on the port, see set_low_latency() (default: False)
+            raw_write: Write frames with os.write on the port's file descriptor
+                instead of through pyserial, see enable_raw_write() (default: False)
+            reconnect: Survive a missing or unplugged widget: failed writes drop
+                the frame instead of raising, and the port is reopened in the
+                background with exponential backoff (default: False, exit if
+                the port can't be opened)
+            reconnect_delay: First reconnect delay in seconds (default: 0.1)
+            reconnect_max_delay: Longest reconnect delay in seconds (default: 5.0)
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.low_latency = low_latency
+        self.raw_write = raw_write
+        
+        # Supervised connection (see reconnect): serial is None while disconnected
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.disconnects = 0
+        self.frames_dropped = 0
+        self._write_lock = threading.Lock()
+        self._reconnect_thread = None
+        self._reconnect_stop = threading.Event()
+        # Called instead of _resend() once the port is reopened, by a wrapper
+        # (e.g. RedundantOutput) that sends its own state through this widget
+        self.on_reconnect = None
+        self.serial = None
+        try:
+            self.serial = self._open()
+        except serial.SerialException as e:
+            print(f"Error: Could not open serial port {port}")
+            print(f"Details: {e}")
+            if not reconnect:
+                sys.exit(1)
+        
+        self._init_packet(self.SEND_DMX)
+        
+        # asyncio output (see open_async)
+        self._async_transport = None
+        
+        # Frame writes: duration of every write, and the raw fd path (see enable_raw_write)
+        self.write_stats = TimingStats()
+        self._raw_fd = None
+        
+        super().__init__(**kwargs)
+        
+        if self.serial is None:
+            self._start_reconnect()
+        else:
+            self._configure_port()
+    
+    def _open(self):
+        """Open the serial port."""
+        connection = serial.Serial(self.port, baudrate=self.baudrate, timeout=1)
+        print(f"Connected to DMX controller on {self.port}")
+        return connection
+    
+    def _configure_port(self):
+        """Apply low_latency and raw_write to a newly opened port."""
+        if self.low_latency:
+            self.set_low_latency()
+        if self.raw_write:
+            self._raw_fd = self.serial.fileno()
+    
+    @property
+    def connected(self):
+        """Whether the widget's port is open."""
+        return self.serial is not None
+    
+    def _write_packet(self, packet):
+        """Write an encoded packet to the port."""
+        if self._write_frame(packet):
+            self.frames_sent += 1
+    
+    def _write_frame(self, packet):
+        """
+        Write a packet to the port and record how long the write took.
+        
+        With reconnect, a frame that can't be written (disconnected, or the
+        write fails) is counted in frames_dropped instead of raising.
+        
+        Returns:
+            True if the packet was written
+        """
+        with self._write_lock:
+            if self.serial is None:
+                self.frames_dropped += 1
+                return False
+            start = time.perf_counter()
+            try:
+                if self._async_transport is not None:
+                    self._async_transport.flush(self.serial.timeout)
+                if self._raw_fd is None:
+                    self.serial.write(packet)
+                else:
+                    self._write_raw(packet)
+            except (serial.SerialException, OSError) as e:
+                if not self.reconnect:
+                    raise
+                self._connection_lost(e)
+                self.frames_dropped += 1
+                return False
+            self.write_stats.add(time.perf_counter() - start)
+            return True
+    
+    def _connection_lost(self, error):
+        """Close the failed port and start reconnecting. Called with the write lock held."""
+        print(f"DMX controller on {self.port} lost: {error}")
+        self.disconnects += 1
+        try:
+            self.serial.close()
+        except (serial.SerialException, OSError):
+            pass
+        self.serial = None
+        if self.raw_write:
+            self._raw_fd = None
+        if self._async_transport is not None:
+            self._async_transport.abort(error)
+            self._async_transport = None
+        self._start_reconnect()
+    
+    def _start_reconnect(self):
+        """Start the reconnect thread unless it is already running or the output is closed."""
+        if self._reconnect_thread is not None or self._reconnect_stop.is_set():
+            return
+        self._reconnect_thread = threading.Thread(target=self._reconnect_loop,
+                                                  name="dmx-reconnect", daemon=True)
+        self._reconnect_thread.start()
+    
+    def _reconnect_loop(self):
+        """Reopen the port with exponential backoff until the widget is back."""
+        delay = self.reconnect_delay
+        try:
+            while not self._reconnect_stop.is_set():
+                if self.serial is None:
+                    if not self._try_reconnect():
+                        self._reconnect_stop.wait(delay)
+                        delay = min(delay * 2, self.reconnect_max_delay)
+                        continue
+                    delay = self.reconnect_delay
+                
+                # Exit under the lock so a failure right now still finds no thread and starts one
+                with self._write_lock:
+                    if self.serial is not None:
+                        self._reconnect_thread = None
+                        return
+        finally:
+            # Whatever ends this thread, a later failure must be able to start another
+            with self._write_lock:
+                if self._reconnect_thread is threading.current_thread():
+                    self._reconnect_thread = None
+    
+    def _try_reconnect(self):
+        """
+        Open and configure the port, then resend the current state (or call on_reconnect).
+        
+        Returns:
+            True if the widget is connected afterwards. A failure at any step
+            counts as a failed open: the new connection is closed and the
+            next attempt starts from scratch.
+        """
+        try:
+            connection = self._open()
+        except (serial.SerialException, OSError):
+            return False
+        try:
+            with self._write_lock:
+                self.serial = connection
+                self._configure_port()
+            if self.on_reconnect is not None:
+                self.on_reconnect()
+            else:
+                self._resend()
+        except Exception as e:
+            print(f"DMX controller on {self.port} failed after reopening: {e}")
+            with self._write_lock:
+                if self.serial is connection:
+                    self.serial = None
+                    if self.raw_write:
+                        self._raw_fd = None
+            try:
+                connection.close()
+            except (serial.SerialException, OSError):
+                pass
+            return False
+        return self.serial is connection  # the resend may have lost it again
+    
+    def _write_raw(self, packet):
+        """Write a packet with os.write, waiting for the port whenever it is full."""
+        view = memoryview(packet)
+        while view:
+            try:
+                written = os.write(self._raw_fd, view)
+            except BlockingIOError:
+                # pyserial opens the port non-blocking
+                if not select.select([], [self._raw_fd], [], self.serial.timeout)[1]:
+                    raise TimeoutError("DMX controller write timed out")
+                continue
+            view = view[written:]
+    
+    def enable_raw_write(self, fd=None):
+        """
+        Write frames straight to the port's file descriptor with os.write,
+        skipping pyserial's per-write overhead. Configuration messages still
+        go through pyserial.
+        
+        Args:
+            fd: File descriptor to write to (default: the serial port's, also
+                after a reconnect)
+        """
+        if fd is None:
+            self.raw_write = True
+            fd = self.serial.fileno() if self.serial is not None else None
+        self._raw_fd = fd
+    
+    def set_low_latency(self, port=None):
+        """
+        Configure an FTDI-based widget for low latency (Linux only).
+        
+        Sets the driver's latency_timer to 1 ms through sysfs (needs write
+        access to /sys/bus/usb-serial/devices/<tty>/latency_timer, e.g. a udev
+        rule) and the ASYNC_LOW_LATENCY flag on the port through TIOCSSERIAL.
+        Either step that isn't possible is reported and skipped.
+        
+        Args:
+            port: Serial port path (default: the open port's)
+        
+        Returns:
+            Dict with the latency_timer in ms (None if unchanged) and whether
+            ASYNC_LOW_LATENCY was set
+        """
+        result = {'latency_timer': None, 'async_low_latency': False}
+        
+        tty = os.path.basename(os.path.realpath(port or self.serial.port))
+        path = f"/sys/bus/usb-serial/devices/{tty}/latency_timer"
+        try:
+            with open(path, 'w') as f:
+                f.write(str(self.FTDI_LATENCY_TIMER_MS))
+            result['latency_timer'] = self.FTDI_LATENCY_TIMER_MS
+            print(f"FTDI latency timer set to {self.FTDI_LATENCY_TIMER_MS} ms")
+        except OSError as e:
+            print(f"Could not set FTDI latency timer ({path}): {e}")
+        
+        try:
+            import array
+            import fcntl
+            import termios
+            # struct serial_struct; flags is its fifth int
+            serial_struct = array.array('i', [0] * 32)
+            fcntl.ioctl(self.serial.fileno(), termios.TIOCGSERIAL, serial_struct)
+            serial_struct[4] |= self.ASYNC_LOW_LATENCY
+            fcntl.ioctl(self.serial.fileno(), termios.TIOCSSERIAL, serial_struct)
+            result['async_low_latency'] = True
+            print("ASYNC_LOW_LATENCY set on serial port")
+        except (ImportError, AttributeError, OSError) as e:
+            print(f"Could not set ASYNC_LOW_LATENCY: {e}")
+        return result
+    
+    def _send_message(self, label, data=b''):
+        """Send a non-DMX Enttec message (configuration requests)."""
+        if self.serial is None:
+            raise ConnectionError(f"DMX controller on {self.port} is disconnected")
+        self.serial.write(_enttec_message(label, data))
+    
+    def _read_message(self, label):
+        """
+        Read Enttec messages from the widget until one with the given label arrives.
+        
+        Returns:
+            The message payload as bytes
+        """
+        return _read_enttec_message(self.serial, label)
+    
+    def get_serial_number(self):
+        """
+        Read the widget's serial number (Enttec "Get Widget Serial Number", label 10).
+        
+        Returns:
+            The serial number as a string of decimal digits
+        """
+        self._send_message(self.GET_WIDGET_SERIAL)
+        return _decode_serial_number(self._read_message(self.GET_WIDGET_SERIAL))
+    
+    def get_widget_parameters(self):
+        """
+        Read the widget's output timing (Enttec "Get Widget Parameters", label 3).
+        
+        Call this before start_output(); replies are read from the same port.
+        
+        Returns:
+            Dict with firmware version, break_us, mab_us and rate (frames per
+            second, 0 = as fast as the widget can)
+        """
+        self._send_message(self.GET_WIDGET_PARAMS, b'\x00\x00')
+        reply = self._read_message(self.GET_WIDGET_PARAMS)
+        if len(reply) < 5:
+            raise ValueError(f"Widget parameters reply too short ({len(reply)} bytes)")
+        self.break_us = reply[2] * self.WIDGET_TIME_UNIT_US
+        self.mab_us = reply[3] * self.WIDGET_TIME_UNIT_US
+        return {
+            'firmware': reply[0] | (reply[1] << 8),
+            'break_us': self.break_us,
+            'mab_us': self.mab_us,
+            'rate': reply[4],
+        }
+    
+    def set_widget_parameters(self, break_us=None, mab_us=None, rate=0):
+        """
+        Set the widget's output timing (Enttec "Set Widget Parameters", label 4).
+        
+        Args:
+            break_us: Break time in microseconds, 96-1355 (default: keep current)
+            mab_us: Mark-after-break time in microseconds, 11-1355 (default: keep current)
+            rate: Output rate in frames per second, 1-40, or 0 to send as fast
+                as the widget can (default: 0)
+        """
+        break_us = self.break_us if break_us is None else break_us
+        mab_us = self.mab_us if mab_us is None else mab_us
+        break_units = round(break_us / self.WIDGET_TIME_UNIT_US)
+        mab_units = round(mab_us / self.WIDGET_TIME_UNIT_US)
+        if not 9 <= break_units <= 127:
+            raise ValueError(f"Break time {break_us}us out of range (96-1355us)")
+        if not 1 <= mab_units <= 127:
+            raise ValueError(f"Mark-after-break time {mab_us}us out of range (11-1355us)")
+        if not 0 <= rate <= 40:
+            raise ValueError(f"Output rate {rate} out of range (0-40)")
+        
+        self._send_message(self.SET_WIDGET_PARAMS, bytes([0, 0, break_units, mab_units, rate]))
+        self.break_us = break_units * self.WIDGET_TIME_UNIT_US
+        self.mab_us = mab_units * self.WIDGET_TIME_UNIT_US
+    
+    def set_receive_mode(self, on_change=True):
+        """
+        Choose how the widget reports DMX arriving at its input
+        (Enttec "Receive DMX on Change", label 8).
+        
+        Args:
+            on_change: True to send only changed channels (label 9), False to
+                send every received packet in full (label 5) (default: True)
+        """
+        self._send_message(self.RECEIVE_DMX_ON_CHANGE, bytes([1 if on_change else 0]))
+    
+    def open_async(self, fd=None):
+        """
+        Attach an asyncio transport for send_dmx_async().
+        
+        Args:
+            fd: File descriptor to write to (default: the serial port's)
+        
+        Returns:
+            The AsyncEnttecTransport
+        """
+        self._async_transport = AsyncEnttecTransport(self.serial.fileno() if fd is None else fd,
+                                                     lock=self._write_lock,
+                                                     write_stats=self.write_stats)
+        return self._async_transport
+    
+    async def _write_packet_async(self, packet):
+        """
+        Write a packet through the asyncio transport. If the port is still
+        busy with earlier frames, only the newest waiting frame is kept;
+        older ones are dropped.
+        """
+        if await self._write_frame_async(packet, self.SEND_DMX):
+            self.frames_sent += 1
+            return True
+        return False
+    
+    async def _write_frame_async(self, packet, label):
+        """
+        Async counterpart of _write_frame(), shared by both Mk2 ports.
+        
+        Waiting packets are replaced per label, so a port-2 frame never
+        drops a port-1 frame.
+        
+        Returns:
+            True if the packet was written
+        """
+        if self.serial is None:
+            self.frames_dropped += 1
+            return False
+        if self._async_transport is None:
+            self.open_async()
+        try:
+            return await self._async_transport.send(packet, key=label)
+        except OSError as e:
+            if not self.reconnect:
+                raise
+            with self._write_lock:
+                if self.serial is not None:
+                    self._connection_lost(e)
+            self.frames_dropped += 1
+            return False
+    
+    def _close(self):
+        """Stop reconnecting and close the serial connection."""
+        self._reconnect_stop.set()
+        thread = self._reconnect_thread
+        if thread is not None:
+            thread.join(timeout=1)
+        if self.serial is not None:
+            self.serial.close()
+        print("DMX controller disconnected")
+
+
+class _OutputPath:
+    """
+    One output of a RedundantOutput, written from its own thread so a
+    stalled write never holds up the other path. Latest wins: a packet
+    submitted while the previous one is still waiting replaces it.
+    """
+    
+    def __init__(self, name, output):
+        self.name = name
+        self.output = output
+        self.latency = TimingStats()  # submit to write complete
+        self.frames_replaced = 0
+        self.ok = True                # whether the last write succeeded
+        self.done = threading.Event()  # set when no submitted packet is outstanding
+        self.done.set()
+        self._condition = threading.Condition()
+        self._pending = None
+        self._submitted = None
+        self._busy_since = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"dmx-path-{name}", daemon=True)
+        self._thread.start()
+    
+    def submit(self, packet):
+        """Queue a packet for writing, replacing one that hasn't started yet."""
+        with self._condition:
+            if self._pending is not None:
+                self.frames_replaced += 1
+            self._pending = packet
+            self._submitted = time.perf_counter()
+            self.done.clear()
+            self._condition.notify()
+    
+    def healthy(self, stall_timeout):
+        """
+        Connected, last write succeeded (or the output reconnected since), and
+        no write has been running longer than stall_timeout.
+        """
+        busy_since = self._busy_since
+        if busy_since is not None and time.perf_counter() - busy_since >= stall_timeout:
+            return False
+        return self.ok and getattr(self.output, 'connected', True)
+    
+    def _run(self):
+        """Writer thread: write each pending packet through the output."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                packet, submitted = self._pending, self._submitted
+                self._pending = None
+                self._busy_since = time.perf_counter()
+            
+            sent = self.output.frames_sent
+            try:
+                self.output._write_packet(packet)
+                self.ok = self.output.frames_sent > sent
+            except (serial.SerialException, OSError) as e:
+                print(f"DMX output path {self.name} failed: {e}")
+                self.ok = False
+            if self.ok:
+                self.latency.add(time.perf_counter() - submitted)
+            
+            with self._condition:
+                self._busy_since = None
+                if self._pending is None:
+                    self.done.set()
+    
+    def close(self, timeout=1.0):
+        """Finish the outstanding write, stop the thread and close the output."""
+        self.done.wait(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        self.output.close()
+
+
+class RedundantOutput(_EnttecPacketBuffer, DMXOutput):
+    """
+    One universe on two Enttec widgets, for shows that can't go dark.
+    
+    Each frame is encoded once and the same packet goes to both widgets,
+    each written from its own thread. In 'mirror' mode every frame goes to
+    both. In 'standby' mode frames go to the active widget only; if its
+    write fails or takes longer than stall_timeout, the same frame goes to
+    the standby at once and the standby becomes active. Every probe_interval
+    the current frame is also written to the standby, so its health and
+    latency are known before it is needed. Failover works in both
+    directions; the output stays on the new widget until that one fails.
+    
+    Give the widgets reconnect=True so a failed one recovers in the
+    background: once reopened it gets the current frame (not its own blank
+    universe) and counts as healthy again.
+    """
+    
+    MODES = ('mirror', 'standby')
+    
+    # Longest a write may take before the path counts as stalled; well under
+    # one frame period at the default output rate
+    DEFAULT_STALL_TIMEOUT = 0.01
+    
+    # How often the standby gets the current frame as a health probe
+    DEFAULT_PROBE_INTERVAL = 0.5
+    
+    def __init__(self, primary, backup, mode='mirror', stall_timeout=DEFAULT_STALL_TIMEOUT,
+                 probe_interval=DEFAULT_PROBE_INTERVAL, **kwargs):
+        """
+        Initialize redundant output.
+        
+        Args:
+            primary: DMXUSB for the primary widget
+            backup: DMXUSB for the backup widget
+            mode: 'mirror' (write both) or 'standby' (write the active one,
+                fail over to the other) (default: 'mirror')
+            stall_timeout: Seconds before a running write counts as stalled (default: 0.01)
+            probe_interval: Seconds between probe writes to the standby (default: 0.5)
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode {mode!r} (use 'mirror' or 'standby')")
+        self.mode = mode
+        self.stall_timeout = stall_timeout
+        self.probe_interval = probe_interval
+        self.failovers = 0
+        self._init_packet(DMXUSB.SEND_DMX)  # encoded once, written to both widgets
+        self._last_packet = None
+        self._last_probe = time.perf_counter()
+        
+        self.paths = [_OutputPath('primary', primary), _OutputPath('backup', backup)]
+        self.active = self.paths[0]
+        for path in self.paths:
+            if hasattr(path.output, 'on_reconnect'):
+                path.output.on_reconnect = lambda path=path: self._on_reconnect(path)
+        
+        super().__init__(**kwargs)
+    
+    def _write_packet(self, packet):
+        """Hand the packet to both paths (mirror) or the active one, failing over if it stalls or fails."""
+        packet = bytes(packet)  # one copy, shared by both writer threads
+        self._last_packet = packet
+        if self.mode == 'mirror':
+            for path in self.paths:
+                path.submit(packet)
+            self.frames_sent += 1
+            return
+        
+        active = self.active
+        if not active.healthy(self.stall_timeout):
+            active = self._fail_over() or active
+        active.submit(packet)
+        if active.done.wait(self.stall_timeout) and active.ok:
+            self.frames_sent += 1
+            self._probe(packet)
+            return
+        
+        # Stalled or failed: the standby takes this same frame
+        standby = self._fail_over()
+        if standby is not None:
+            standby.submit(packet)
+            self.frames_sent += 1
+    
+    def _standby(self):
+        """The path that isn't active."""
+        return self.paths[1] if self.active is self.paths[0] else self.paths[0]
+    
+    def _probe(self, packet):
+        """Every probe_interval, write the frame to the idle standby to keep its health current."""
+        now = time.perf_counter()
+        if now - self._last_probe < self.probe_interval:
+            return
+        standby = self._standby()
+        if standby.done.is_set():
+            standby.submit(packet)
+            self._last_probe = now
+    
+    def _on_reconnect(self, path):
+        """A widget's port was reopened: it is healthy again and gets the current frame."""
+        path.ok = True
+        packet = self._last_packet
+        if packet is not None:
+            path.submit(packet)
+    
+    def _fail_over(self):
+        """Make the other path active if it is healthy; returns it, or None."""
+        other = self._standby()
+        if not other.healthy(self.stall_timeout):
+            return None
+        print(f"DMX output failing over from {self.active.name} to {other.name}")
+        self.active = other
+        self.failovers += 1
+        return other
+    
+    def stats(self):
+        """Mode, active path, failover count and per-path write latency, as plain dicts."""
+        return {
+            'mode': self.mode,
+            'active': self.active.name,
+            'failovers': self.failovers,
+            'paths': {path.name: {'latency': path.latency.as_dict(),
+                                  'replaced': path.frames_replaced,
+                                  'healthy': path.healthy(self.stall_timeout)}
+                      for path in self.paths},
+        }
+    
+    def _close(self):
+        """Close both widgets."""
+        for path in self.paths:
+            path.close()
+
+
+def _enttec_message(label, data=b''):
+    """Build a complete Enttec message: START_MSG | label | length (LE) | data | END_MSG."""
+    message = bytearray([DMXUSB.START_MSG, label, len(data) & 0xFF, (len(data) >> 8) & 0xFF])
+    message.extend(data)
+    message.append(DMXUSB.END_MSG)
+    return message
+
+
+# Replies are given up on after this long, or after this many bytes that aren't
+# Enttec messages (a GPS, modem or microcontroller can stream them forever)
+ENTTEC_REPLY_TIMEOUT = 1.0
+ENTTEC_REPLY_MAX_SKIP = 1024
+
+
+def _read_enttec_message(port, label, timeout=ENTTEC_REPLY_TIMEOUT, max_skip=ENTTEC_REPLY_MAX_SKIP):
+    """
+    Read Enttec messages from an open serial port until one with the given label arrives.
+    
+    Args:
+        port: Open serial port
+        label: Label of the reply
+        timeout: Longest wait for the reply in seconds (default: 1.0)
+        max_skip: Most non-message bytes to skip before giving up (default: 1024)
+    
+    Returns:
+        The message payload as bytes
+    """
+    deadline = time.monotonic() + timeout
+    skipped = 0
+    while True:
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"No reply with label {label} from DMX controller")
+        byte = port.read(1)
+        if not byte:
+            raise TimeoutError(f"No reply with label {label} from DMX controller")
+        if byte[0] != DMXUSB.START_MSG:
+            skipped += 1
+            if skipped > max_skip:
+                raise ValueError(f"No Enttec reply in {skipped} bytes: not a DMX controller")
+            continue
+        header = port.read(3)
+        if len(header) < 3:
+            raise TimeoutError("Incomplete reply from DMX controller")
+        length = header[1] | (header[2] << 8)
+        data = port.read(length)
+        end = port.read(1)
+        if len(data) < length or end != bytes([DMXUSB.END_MSG]):
+            continue  # corrupt or truncated message, resynchronise on START_MSG
+        if header[0] == label:
+            return data
+
+
+def _decode_serial_number(reply):
+    """Enttec serial numbers are 4 BCD bytes, least significant first."""
+    if len(reply) < 4:
+        raise ValueError(f"Serial number reply too short ({len(reply)} bytes)")
+    return ''.join(f"{byte:02x}" for byte in reversed(reply[:4]))
+
+
+class EnttecParser:
+    """
+    Incremental parser for an Enttec message stream.
+    
+    Bytes are copied into one fixed buffer as they arrive, so messages may
+    be split across reads in any way. feed() yields (label, payload) for
+    every complete message; payload is a memoryview into the buffer and is
+    only valid until the iteration continues. Bytes that don't form a valid
+    message are skipped and counted in errors.
+    """
+    
+    # Largest payload accepted; longer length fields are treated as corruption
+    MAX_PAYLOAD = 600
+    
+    def __init__(self, max_payload=MAX_PAYLOAD):
+        self.max_payload = max_payload
+        self._buffer = bytearray(2 * (DMXUSB.HEADER_SIZE + max_payload + 1))
+        self._view = memoryview(self._buffer)
+        self._end = 0
+        self.messages = 0
+        self.errors = 0
+    
+    def feed(self, data):
+        """
+        Add received bytes and yield each complete message.
+        
+        Yields:
+            (label, payload) tuples
+        """
+        data = memoryview(data)
+        while data:
+            room = len(self._buffer) - self._end
+            chunk, data = data[:room], data[room:]
+            self._buffer[self._end:self._end + len(chunk)] = chunk
+            self._end += len(chunk)
+            yield from self._parse()
+    
+    def _parse(self):
+        """Yield complete messages from the buffer, then move any partial one to the front."""
+        buffer = self._buffer
+        start, end = 0, self._end
+        try:
+            while start < end:
+                if buffer[start] != DMXUSB.START_MSG:
+                    found = buffer.find(DMXUSB.START_MSG, start, end)
+                    skip_to = end if found < 0 else found
+                    self.errors += skip_to - start
+                    start = skip_to
+                    continue
+                if end - start < DMXUSB.HEADER_SIZE:
+                    break
+                length = buffer[start + 2] | (buffer[start + 3] << 8)
+                stop = start + DMXUSB.HEADER_SIZE + length
+                if length > self.max_payload or (stop < end and buffer[stop] != DMXUSB.END_MSG):
+                    # Not a real message start: resynchronise on the next START_MSG
+                    self.errors += 1
+                    start += 1
+                    continue
+                if stop >= end:
+                    break
+                self.messages += 1
+                label = buffer[start + 1]
+                payload = self._view[start + DMXUSB.HEADER_SIZE:stop]
+                start = stop + 1
+                yield label, payload
+        finally:
+            remaining = end - start
+            if start and remaining:
+                buffer[:remaining] = buffer[start:end]
+            self._end = remaining
+
+
+class DMXInput:
+    """
+    DMX input through an Enttec widget's DMX IN port.
+    
+    Keeps the received universe in dmx_data and reports only what changed:
+    each update is a list of (channel, value) pairs. Works with both widget
+    receive modes, full packets (label 5) and change-of-state (label 9).
+    """
+    
+    # Full packets are compared in blocks; only differing blocks are scanned per channel
+    COMPARE_BLOCK = 32
+    
+    def __init__(self, widget, on_change=True):
+        """
+        Initialize DMX input.
+        
+        Args:
+            widget: DMXUSB connected to the widget
+            on_change: Put the widget in change-of-state mode (default: True),
+                see DMXUSB.set_receive_mode(); None leaves the mode as it is
+        """
+        self.widget = widget
+        self.dmx_data = bytearray(DMXOutput.UNIVERSE_SIZE)
+        self._dmx_view = memoryview(self.dmx_data)
+        self.parser = EnttecParser()
+        self.packets = 0
+        self.receive_errors = 0  # packets the widget flagged as overrun or queue overflow
+        if on_change is not None:
+            widget.set_receive_mode(on_change)
+    
+    def feed(self, data):
+        """
+        Process bytes read from the widget.
+        
+        Yields:
+            Non-empty lists of (channel, value) changes, one per update
+        """
+        for label, payload in self.parser.feed(data):
+            if label == DMXUSB.RECEIVED_DMX:
+                changes = self._apply_packet(payload)
+            elif label == DMXUSB.RECEIVED_DMX_CHANGE:
+                changes = self._apply_change_of_state(payload)
+            else:
+                continue
+            if changes:
+                yield changes
+    
+    def _apply_packet(self, payload):
+        """Apply a full received packet: status | start code | channel data."""
+        if len(payload) < 2:
+            return None
+        self.packets += 1
+        if payload[0]:
+            self.receive_errors += 1
+            return None
+        if payload[1] != DMX_START_CODE:
+            return None  # alternate start code (RDM, text, ...): not channel data
+        
+        data = payload[2:2 + DMXOutput.UNIVERSE_SIZE]
+        current = self.dmx_data
+        current_view = self._dmx_view
+        changes = []
+        for block in range(0, len(data), self.COMPARE_BLOCK):
+            block_end = min(block + self.COMPARE_BLOCK, len(data))
+            if data[block:block_end] == current_view[block:block_end]:
+                continue
+            for index in range(block, block_end):
+                value = data[index]
+                if value != current[index]:
+                    current[index] = value
+                    changes.append((index + 1, value))
+        return changes
+    
+    def _apply_change_of_state(self, payload):
+        """
+        Apply a change-of-state packet: start block | 40-bit changed mask | values.
+        
+        Bit n of the mask is slot start block * 8 + n; slot 0 is the start
+        code, so slot numbers equal channel numbers.
+        """
+        if len(payload) < 6:
+            return None
+        self.packets += 1
+        first_slot = payload[0] * 8
+        mask = int.from_bytes(payload[1:6], 'little')
+        values = payload[6:]
+        changes = []
+        index = 0
+        for bit in range(40):
+            if not mask >> bit & 1:
+                continue
+            if index >= len(values):
+                break
+            value = values[index]
+            index += 1
+            slot = first_slot + bit
+            if 1 <= slot <= DMXOutput.UNIVERSE_SIZE:
+                self.dmx_data[slot - 1] = value
+                changes.append((slot, value))
+        return changes
+    
+    def changes(self):
+        """
+        Read from the widget and yield changes as they arrive (blocking).
+        
+        Yields:
+            Non-empty lists of (channel, value) changes
+        """
+        port = self.widget.serial
+        while True:
+            data = port.read(port.in_waiting or 1)
+            if data:
+                yield from self.feed(data)
+    
+    async def changes_async(self, fd=None):
+        """
+        Async iterator version of changes(): reads without blocking the event loop.
+        
+        Args:
+            fd: File descriptor to read from (default: the serial port's)
+        
+        Yields:
+            Non-empty lists of (channel, value) changes
+        """
+        fd = self.widget.serial.fileno() if fd is None else fd
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(fd, readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                try:
+                    data = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    return
+                for changes in self.feed(data):
+                    yield changes
+        finally:
+            loop.remove_reader(fd)
+
+
+# State files live next to this script, so they're found whatever the working directory
+STATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Widget discovery
+WIDGET_STATE_FILE = os.path.join(STATE_DIR, 'dmx_widgets.json')
+SERIAL_BY_ID_DIR = '/dev/serial/by-id'
+
+# USB vendor/product IDs of Enttec-compatible widgets (FTDI FT232R/FT245R)
+ENTTEC_USB_IDS = ((0x0403, 0x6001),)
+
+# /dev/serial/by-id name prefixes (usb-<manufacturer>_...) of Enttec-compatible widgets
+ENTTEC_BY_ID_PREFIXES = ('usb-FTDI_', 'usb-ENTTEC_')
+
+
+def candidate_ports():
+    """
+    Serial ports that may be Enttec widgets.
+    
+    Probing opens the port and writes to it, which resets an Arduino and
+    sends stray bytes to anything else, so only ports that look like
+    widgets are returned: /dev/serial/by-id links with a known
+    manufacturer prefix or VID/PID first (their names don't change across
+    reboots), then other ports with a known VID/PID. VID/PID matching needs
+    pyserial's port listing.
+    """
+    known = set()
+    try:
+        from serial.tools import list_ports
+    except ImportError:  # optional: only used to find ports by VID/PID
+        pass
+    else:
+        known = {os.path.realpath(info.device) for info in list_ports.comports()
+                 if (info.vid, info.pid) in ENTTEC_USB_IDS}
+    
+    ports = []
+    if os.path.isdir(SERIAL_BY_ID_DIR):
+        for name in sorted(os.listdir(SERIAL_BY_ID_DIR)):
+            path = os.path.join(SERIAL_BY_ID_DIR, name)
+            if name.startswith(ENTTEC_BY_ID_PREFIXES) or os.path.realpath(path) in known:
+                ports.append(path)
+    seen = {os.path.realpath(port) for port in ports}
+    ports += sorted(device for device in known if device not in seen)
+    return ports
+
+
+def probe_widget(port, timeout=0.1):
+    """
+    Ask the device on a port for its Enttec serial number.
+    
+    Args:
+        port: Serial port path
+        timeout: Longest wait for the reply in seconds (default: 0.1)
+    
+    Returns:
+        The serial number, or None if the port can't be opened or doesn't answer
+    """
+    try:
+        connection = serial.Serial(port, baudrate=115200, timeout=timeout)
+    except serial.SerialException:
+        return None
+    try:
+        connection.write(_enttec_message(DMXUSB.GET_WIDGET_SERIAL))
+        reply = _read_enttec_message(connection, DMXUSB.GET_WIDGET_SERIAL, timeout=timeout)
+        return _decode_serial_number(reply)
+    except (TimeoutError, ValueError, OSError):
+        return None
+    finally:
+        connection.close()
+
+
+def discover_widgets(state_file=WIDGET_STATE_FILE, ports=None):
+    """
+    Probe every candidate port and cache the widgets found.
+    
+    Args:
+        state_file: JSON file mapping serial numbers to ports (None: don't save)
+        ports: Ports to probe (default: candidate_ports())
+    
+    Returns:
+        Dict mapping serial number to port path
+    """
+    widgets = {}
+    for port in candidate_ports() if ports is None else ports:
+        serial_number = probe_widget(port)
+        if serial_number is not None and serial_number not in widgets:
+            widgets[serial_number] = port
+    if state_file is not None:
+        try:
+            with open(state_file, 'w') as f:
+                json.dump(widgets, f, indent=2)
+        except OSError as e:
+            # Only a cache: the next start probes again
+            print(f"Could not save widget cache {state_file}: {e}")
+    return widgets
+
+
+def find_widget(serial_number=None, state_file=WIDGET_STATE_FILE, ports=None):
+    """
+    Find a widget's port, trying the cached result before a full probe.
+    
+    A cached /dev/serial/by-id path is trusted as long as it exists, since
+    the link name contains the device's serial number; any other cached
+    path is checked with one serial-number request.
+    
+    Args:
+        serial_number: Widget to find (default: any widget)
+        state_file: JSON cache written by discover_widgets(); one that
+            can't be read or written counts as a miss
+        ports: Ports to probe if the cache misses (default: candidate_ports())
+    
+    Returns:
+        The port path, or None if no matching widget is connected
+    """
+    cached = {}
+    if state_file is not None and os.path.exists(state_file):
+        try:
+            with open(state_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable widget cache {state_file}: {e}")
+        if not isinstance(cached, dict):
+            cached = {}
+    for number, port in cached.items():
+        if serial_number is not None and number != serial_number:
+            continue
+        if not os.path.exists(port):
+            continue
+        if port.startswith(SERIAL_BY_ID_DIR + os.sep) or probe_widget(port) == number:
+            return port
+    
+    widgets = discover_widgets(state_file, ports)
+    if serial_number is not None:
+        return widgets.get(serial_number)
+    return next(iter(widgets.values()), None)
+
+
+class DMXUSBMk2(DMXUSB):
+    """
+    Enttec DMX USB Pro Mk2 compatible widget with both outputs in use.
+    
+    Port 1 is this object, exactly like DMXUSB. Port 2 is the port2
+    attribute, a second DMXOutput with its own universe, change tracking
+    and output thread; both ports share the serial connection. The second
+    port needs the Mk2 API key and port assignment, which are sent when the
+    port opens (and again after a reconnect).
+    
+    The key and the port-2 labels are defined per API key by the vendor;
+    the defaults are the ones published for open-source drivers.
+    """
+    
+    SET_API_KEY = 0x0D
+    API_KEY = bytes([0xAD, 0x88, 0xD0, 0xC8])
+    SET_PORT_ASSIGNMENT = 0xCB
+    SEND_DMX_PORT2 = 0xA9
+    
+    # Port assignment values: 0 = disabled, 1 = DMX (send and receive)
+    PORT_DMX = 1
+    
+    def __init__(self, port='/dev/ttyUSB0', api_key=API_KEY,
+                 port_assignment_label=SET_PORT_ASSIGNMENT, send_dmx_port2_label=SEND_DMX_PORT2,
+                 **kwargs):
+        """
+        Initialize a Mk2 widget.
+        
+        Args:
+            port: Serial port path (default: /dev/ttyUSB0)
+            api_key: 4-byte API key that unlocks the second port
+            port_assignment_label: Label of the "Set Port Assignment" message
+            send_dmx_port2_label: Label of the port-2 "Send DMX" message
+            **kwargs: DMXUSB options; send_on_change, keepalive and trim
+                apply to both ports
+        """
+        if len(api_key) != 4:
+            raise ValueError(f"API key must be 4 bytes, got {len(api_key)}")
+        self.api_key = bytes(api_key)
+        self.port_assignment_label = port_assignment_label
+        self.send_dmx_port2_label = send_dmx_port2_label
+        self.port2 = None
+        super().__init__(port, **kwargs)
+        self.port2 = Mk2SecondPort(self, send_on_change=self.send_on_change,
+                                   keepalive=self.keepalive, trim=self.trim)
+    
+    def _configure_port(self):
+        """Apply DMXUSB port settings, then unlock and assign the second port."""
+        super()._configure_port()
+        self.activate_port2()
+    
+    def activate_port2(self):
+        """Send the API key and set both ports to DMX output."""
+        self._send_message(self.SET_API_KEY, self.api_key)
+        self._send_message(self.port_assignment_label, bytes([self.PORT_DMX, self.PORT_DMX]))
+    
+    def _resend(self):
+        """Put both ports' current state back on the wire."""
+        super()._resend()
+        if self.port2 is not None:
+            self.port2._resend()
+    
+    def _close(self):
+        """Black out and close port 2, then close the serial connection."""
+        if self.port2 is not None:
+            self.port2.close()
+        super()._close()
+
+
+class Mk2SecondPort(_EnttecPacketBuffer, DMXOutput):
+    """
+    Second output of a DMXUSBMk2: an independent universe written through
+    the widget's serial connection with the port-2 send label.
+    """
+    
+    def __init__(self, widget, **kwargs):
+        """
+        Initialize port 2.
+        
+        Args:
+            widget: DMXUSBMk2 that owns the serial connection
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
+        """
+        self.widget = widget
+        self._init_packet(widget.send_dmx_port2_label)
+        super().__init__(**kwargs)
+    
+    def _write_packet(self, packet):
+        """Write an encoded packet through the widget's connection."""
+        if self.widget._write_frame(packet):
+            self.frames_sent += 1
+    
+    async def _write_packet_async(self, packet):
+        """Write an encoded packet through the widget's asyncio transport."""
+        if await self.widget._write_frame_async(packet, self.widget.send_dmx_port2_label):
+            self.frames_sent += 1
+            return True
+        return False
+
+
+def _spin_until_ns(deadline_ns):
+    """Busy-wait until an absolute perf_counter_ns deadline (for microsecond timing)."""
+    while time.perf_counter_ns() < deadline_ns:
+        pass
+
+
+class OpenDMXUSB(DMXOutput):
+    """
+    "Open DMX" FTDI adapter: a plain USB-serial chip with no DMX processor.
+    
+    The host generates the DMX signal itself: each frame is a break (the
+    line held low with the serial break condition), a mark-after-break, then
+    the start code and channels written raw at 250 kbaud, 8N2. Break and
+    MAB are timed by busy-waiting, since sleeps are far coarser than 12 us.
+    
+    The adapter holds no state, so fixtures only see DMX while frames keep
+    coming: use start_output(), which refreshes from a dedicated thread on
+    absolute deadlines. stats() reports the achieved frame rate and jitter.
+    """
+    
+    BAUDRATE = 250000
+    
+    # Output thread: sleep until this close to each frame, then spin
+    DEFAULT_SPIN = 0.002
+    
+    def __init__(self, port='/dev/ttyUSB0', break_us=DMX_BREAK_US, mab_us=DMX_MAB_US, **kwargs):
+        """
+        Initialize Open DMX output.
+        
+        Args:
+            port: Serial port path (default: /dev/ttyUSB0)
+            break_us: Break time in microseconds (default: 176)
+            mab_us: Mark-after-break time in microseconds (default: 12)
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
+        """
+        try:
+            self.serial = serial.Serial(port, baudrate=self.BAUDRATE, bytesize=8, parity='N',
+                                        stopbits=2, timeout=1)
+            print(f"Connected to Open DMX adapter on {port}")
+        except serial.SerialException as e:
+            print(f"Error: Could not open serial port {port}")
+            print(f"Details: {e}")
+            sys.exit(1)
+        
+        # Start code followed by the channel data, written as is after the MAB
+        self._packet = bytearray(1 + self.UNIVERSE_SIZE)
+        self._packet[0] = DMX_START_CODE
+        self._packet_view = memoryview(self._packet)
+        
+        # Timing: measured break length, frame start to frame start, and whole-frame write time
+        self.break_stats = TimingStats()
+        self.frame_interval = TimingStats()
+        self.write_stats = TimingStats()
+        self._last_frame_ns = None
+        
+        super().__init__(**kwargs)
+        self.break_us = break_us
+        self.mab_us = mab_us
+    
+    def _encode(self, data):
+        """Copy channel data after the start code and return a view of the frame."""
+        slots = self.frame_slots
+        if slots == self.UNIVERSE_SIZE:
+            self._packet[1:] = data
+        else:
+            self._packet[1:1 + slots] = data[:slots]
+        return self._packet_view[:1 + slots]
+    
+    def _write_packet(self, packet):
+        """Send one frame: break, mark-after-break, then start code and data."""
+        start = time.perf_counter_ns()
+        if self._last_frame_ns is not None:
+            self.frame_interval.add((start - self._last_frame_ns) / 1e9)
+        self._last_frame_ns = start
+        
+        self.serial.break_condition = True
+        _spin_until_ns(start + round(self.break_us * 1000))
+        self.serial.break_condition = False
+        mab_start = time.perf_counter_ns()
+        self.break_stats.add((mab_start - start) / 1e9)
+        _spin_until_ns(mab_start + round(self.mab_us * 1000))
+        
+        self.serial.write(packet)
+        # The next break must not cut into this frame, so wait until it has left the port
+        self.serial.flush()
+        self.write_stats.add((time.perf_counter_ns() - start) / 1e9)
+        self.frames_sent += 1
+    
+    def start_output(self, rate=DMXOutput.DEFAULT_OUTPUT_RATE, spin=DEFAULT_SPIN):
+        """
+        Start the refresh thread, see DMXOutput.start_output().
+        
+        Args:
+            rate: Frames per second (default: 44); at most max_frame_rate()
+            spin: Busy-wait this many seconds before each frame (default: 0.002)
+        """
+        self.frame_interval.reset()
+        self.break_stats.reset()
+        self._last_frame_ns = None
+        super().start_output(rate, spin)
+    
+    def stats(self):
+        """
+        Achieved frame rate and timing jitter.
+        
+        Returns:
+            Dict with fps (from the mean frame interval), jitter (largest minus
+            smallest frame interval, in seconds), and frame interval, break and
+            write timing as plain dicts
+        """
+        interval = self.frame_interval
+        return {
+            'fps': 1 / interval.mean if interval.count else None,
+            'jitter': interval.max - interval.min if interval.count else None,
+            'frame_interval': interval.as_dict(),
+            'break': self.break_stats.as_dict(),
+            'write': self.write_stats.as_dict(),
+        }
+    
+    def _close(self):
+        """Close the serial connection."""
+        self.serial.close()
+        print("Open DMX adapter disconnected")
+
+
+class AsyncEnttecTransport:
+    """
+    Non-blocking asyncio writer for Enttec packets on a file descriptor.
+    
+    Packets are written with os.write on a non-blocking fd; when the port
+    can't take a whole packet, the rest is written from a loop.add_writer
+    callback. Back-pressure: one packet is in flight and at most one per key
+    (port) waits behind it. A newer frame replaces the waiting one with the
+    same key (only the latest universe state matters), and the replaced
+    frame counts as dropped. A partially written packet is always finished
+    so framing stays intact.
+    
+    The lock is shared with blocking writers (DMXUSB's write lock) but is
+    only held around each os.write, never while the loop waits for the port.
+    A blocking writer that finds a packet in flight finishes it first (see
+    flush()), so a blocking write from the event loop thread itself, such
+    as close(), can't deadlock on it.
+    """
+    
+    def __init__(self, fd, lock=None, write_stats=None):
+        """
+        Initialize the transport.
+        
+        Args:
+            fd: File descriptor of the serial port (set to non-blocking)
+            lock: threading.Lock shared with blocking writers (default: a private one)
+            write_stats: TimingStats to record each packet's write time in (default: none)
+        """
+        self.fd = fd
+        os.set_blocking(fd, False)
+        self.lock = lock if lock is not None else threading.Lock()
+        self.write_stats = write_stats
+        self._busy = False           # a send() is writing, or has been handed the next turn
+        self._loop = None
+        self._buffer = None          # unwritten rest of the packet in flight
+        self._future = None          # resolved when the packet in flight is written
+        self._queued = OrderedDict()  # key -> future resolved when that waiting send() may write
+        self.frames_dropped = 0
+    
+    async def send(self, packet, key=None):
+        """
+        Write a packet, waiting for the port without blocking the event loop.
+        
+        Args:
+            packet: Encoded packet
+            key: Waiting packets are replaced only by newer ones with the same key
+        
+        Returns:
+            True once the packet is written, False if a newer packet replaced it
+        """
+        loop = asyncio.get_running_loop()
+        if self._busy:
+            replaced = self._queued.get(key)
+            if replaced is not None and not replaced.done():
+                replaced.set_result(False)
+                self.frames_dropped += 1
+            packet = bytes(packet)  # the caller may reuse its buffer while this waits
+            self._queued[key] = turn = loop.create_future()
+            try:
+                if not await turn:
+                    return False
+            except asyncio.CancelledError:
+                if turn.done() and not turn.cancelled() and turn.result():
+                    self._next_turn()  # don't keep the turn we were given
+                elif self._queued.get(key) is turn:
+                    del self._queued[key]
+                raise
+        
+        self._busy = True
+        try:
+            await self._write(loop, packet)
+        finally:
+            self._next_turn()
+        return True
+    
+    def _next_turn(self):
+        """Let the longest-waiting send() write next, or mark the transport idle."""
+        while self._queued:
+            turn = self._queued.popitem(last=False)[1]
+            if not turn.done():  # skip waiters cancelled but not yet cleaned up
+                self._busy = True
+                turn.set_result(True)
+                return
+        self._busy = False
+    
+    async def _write(self, loop, packet):
+        """Write one whole packet; the part the port can't take yet is finished by _on_writable."""
+        start = time.perf_counter()
+        with self.lock:
+            try:
+                written = os.write(self.fd, packet)
+            except BlockingIOError:
+                written = 0
+            if written < len(packet):
+                # Keep a copy of the rest, since packet may be a reused buffer
+                self._loop = loop
+                self._buffer = bytes(packet[written:])
+                self._future = future = loop.create_future()
+                loop.add_writer(self.fd, self._on_writable)
+        if written < len(packet):
+            # Finished even if the caller is cancelled, so framing stays intact
+            await asyncio.shield(future)
+        if self.write_stats is not None:
+            self.write_stats.add(time.perf_counter() - start)
+    
+    def _on_writable(self):
+        """Event loop callback: continue writing once the fd accepts data."""
+        with self.lock:
+            if self._buffer:
+                try:
+                    written = os.write(self.fd, self._buffer)
+                except BlockingIOError:
+                    return
+                except OSError as e:
+                    self._buffer = None
+                    self._finish(e)
+                    return
+                self._buffer = self._buffer[written:]
+                if self._buffer:
+                    return
+            self._buffer = None
+        self._finish()
+    
+    def _finish(self, error=None):
+        """Resolve the packet in flight (on the loop thread; repeated calls are ignored)."""
+        future = self._future
+        if future is None or future.done():
+            return
+        self._loop.remove_writer(self.fd)
+        if error is None:
+            future.set_result(True)
+        else:
+            future.set_exception(error)
+    
+    def _finish_threadsafe(self, error=None):
+        try:
+            self._loop.call_soon_threadsafe(self._finish, error)
+        except RuntimeError:
+            pass  # the loop is closed; nothing is waiting any more
+    
+    def flush(self, timeout=None):
+        """
+        Finish the packet in flight with blocking writes, so a blocking
+        writer can use the port. Call with the lock held, from any thread.
+        
+        Args:
+            timeout: Longest wait for the port in seconds (default: no limit)
+        """
+        if not self._buffer:
+            return
+        view = memoryview(self._buffer)
+        self._buffer = None
+        try:
+            while view:
+                if not select.select([], [self.fd], [], timeout)[1]:
+                    raise TimeoutError("DMX controller write timed out")
+                try:
+                    written = os.write(self.fd, view)
+                except BlockingIOError:
+                    continue
+                view = view[written:]
+        except OSError as e:
+            self._finish_threadsafe(e)
+            raise
+        self._finish_threadsafe()
+    
+    def abort(self, error):
+        """Give up on the packet in flight (the port is gone). Call with the lock held."""
+        if self._buffer is not None:
+            self._buffer = None
+            self._finish_threadsafe(error)
+
+
+class ArtNetOutput(DMXOutput):
     """
-    Driver for AVT DMX512 USB controller.
-    Uses Enttec DMX USB Pro protocol.
+    Art-Net output: sends the universe as ArtDmx packets over UDP.
+    
+    Not limited by USB-serial bandwidth, so one process can drive as many
+    universes as the network allows. Unicast to a node's IP, or broadcast.
     """
     
-    # Enttec DMX USB Pro protocol constants
-    START_MSG = 0x7E
-    END_MSG = 0xE7
-    SEND_DMX = 0x06
+    PORT = 6454
+    ID = b'Art-Net\x00'
+    OP_DMX = 0x5000
+    PROTOCOL_VERSION = 14
     
-    def __init__(self, port='/dev/ttyUSB0', baudrate=115200):
+    # Packet layout: ID(8) | OpCode(2, LE) | ProtVer(2) | Sequence | Physical |
+    # SubUni | Net | Length(2, BE) | DMX data
+    HEADER_SIZE = 18
+    SEQUENCE_OFFSET = 12
+    
+    def __init__(self, universe=0, host='255.255.255.255', port=PORT, physical=0,
+                 broadcast=None, **kwargs):
         """
-        Initialize DMX USB controller.
+        Initialize Art-Net output.
         
         Args:
-            port: Serial port path (default: /dev/ttyUSB0)
-            baudrate: Communication speed (default: 115200)
+            universe: 15-bit Art-Net port-address (Net, Sub-Net, Universe; default: 0)
+            host: Node IP for unicast, or a broadcast address (default: 255.255.255.255)
+            port: UDP port (default: 6454)
+            physical: Physical input port reported to receivers (default: 0)
+            broadcast: Enable broadcast (default: if host ends in .255)
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
         """
-        try:
-            self.serial = serial.Serial(port, baudrate=baudrate, timeout=1)
-            print(f"Connected to DMX controller on {port}")
-        except serial.SerialException as e:
-            print(f"Error: Could not open serial port {port}")
-            print(f"Details: {e}")
-            sys.exit(1)
+        if not 0 <= universe <= 0x7FFF:
+            raise ValueError(f"Art-Net universe {universe} out of range (0-32767)")
+        self.universe = universe
+        self.address = (host, port)
         
-        # DMX universe - 512 channels (all initialized to 0)
-        self.dmx_data = [0] * 512
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if broadcast is None:
+            broadcast = host.endswith('.255')
+        if broadcast:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        
+        # Pre-encoded ArtDmx header; only the sequence, length and data change
+        self._packet = bytearray(self.HEADER_SIZE + self.UNIVERSE_SIZE)
+        self._packet[0:8] = self.ID
+        self._packet[8] = self.OP_DMX & 0xFF
+        self._packet[9] = self.OP_DMX >> 8
+        self._packet[10] = 0
+        self._packet[11] = self.PROTOCOL_VERSION
+        self._packet[13] = physical
+        self._packet[14] = universe & 0xFF
+        self._packet[15] = universe >> 8
+        self._packet_view = memoryview(self._packet)
+        self._frame_slots = None
+        self._set_frame_slots(self.UNIVERSE_SIZE)
+        self._sequence = 0
+        
+        super().__init__(**kwargs)
+        print(f"Sending Art-Net universe {universe} to {host}:{port}")
     
-    def set_channel(self, channel, value):
+    def _set_frame_slots(self, slots):
+        """Rewrite the length field for a new frame length (Art-Net requires an even length)."""
+        length = slots + (slots & 1)
+        self._packet[16] = length >> 8
+        self._packet[17] = length & 0xFF
+        self._frame_view = self._packet_view[:self.HEADER_SIZE + length]
+        self._frame_slots = slots
+    
+    def _encode(self, data):
+        """Copy channel data into the persistent packet and return a view of the frame."""
+        slots = self.frame_slots
+        if slots != self._frame_slots:
+            self._set_frame_slots(slots)
+        length = len(self._frame_view) - self.HEADER_SIZE
+        if length == self.UNIVERSE_SIZE:
+            self._packet[self.HEADER_SIZE:] = data
+        else:
+            self._packet[self.HEADER_SIZE:self.HEADER_SIZE + length] = data[:length]
+        return self._frame_view
+    
+    def _write_packet(self, packet):
+        """Stamp the next sequence number on the packet and send it."""
+        if packet is not self._frame_view:
+            # Snapshot packet: bring it into the buffer to set the sequence
+            self._packet[:len(packet)] = packet
+            packet = self._packet_view[:len(packet)]
+        # Sequence runs 1-255; 0 would tell receivers to disable reordering checks
+        self._sequence = self._sequence % 255 + 1
+        self._packet[self.SEQUENCE_OFFSET] = self._sequence
+        self.socket.sendto(packet, self.address)
+        self.frames_sent += 1
+    
+    def _close(self):
+        """Close the UDP socket."""
+        self.socket.close()
+
+
+class SACNOutput(DMXOutput):
+    """
+    sACN (ANSI E1.31) output for one universe.
+    
+    Normally created through SACNSender, which shares one socket, CID and
+    synchronization universe between many universes. All three PDU headers
+    are built once; each send only patches the sequence number and data.
+    """
+    
+    PORT = 5568
+    ACN_ID = b'ASC-E1.17\x00\x00\x00'
+    VECTOR_ROOT_DATA = 0x00000004
+    VECTOR_FRAMING_DATA = 0x00000002
+    VECTOR_DMP_SET_PROPERTY = 0x02
+    
+    # Offsets of the fields patched per packet; data starts after the start code
+    SEQUENCE_OFFSET = 111
+    OPTIONS_OFFSET = 112
+    HEADER_SIZE = 126
+    OPTION_STREAM_TERMINATED = 0x40
+    
+    def __init__(self, universe, priority=100, source_name='dmxmdx', cid=None,
+                 sync_universe=0, host=None, port=PORT, sock=None, **kwargs):
         """
-        Set a DMX channel value.
+        Initialize sACN output.
         
         Args:
-            channel: DMX channel (1-512)
-            value: Channel value (0-255)
+            universe: sACN universe (1-63999)
+            priority: Source priority, 0-200 (default: 100)
+            source_name: Name shown by receivers (default: dmxmdx)
+            cid: 16-byte component identifier (default: random)
+            sync_universe: Universe whose sync packets latch this data (default: 0, none)
+            host: Unicast destination (default: the universe's multicast address)
+            port: UDP port (default: 5568)
+            sock: UDP socket to share with other universes (default: a new one)
+            **kwargs: Output options (send_on_change, keepalive, trim), see DMXOutput
         """
-        if 1 <= channel <= 512:
-            self.dmx_data[channel - 1] = max(0, min(255, value))
+        if not 1 <= universe <= 63999:
+            raise ValueError(f"sACN universe {universe} out of range (1-63999)")
+        if not 0 <= priority <= 200:
+            raise ValueError(f"sACN priority {priority} out of range (0-200)")
+        self.universe = universe
+        self.cid = cid or uuid.uuid4().bytes
+        self.address = (host or sacn_multicast_address(universe), port)
+        self._owns_socket = sock is None
+        self.socket = sock or sacn_socket()
+        
+        packet = bytearray(self.HEADER_SIZE + self.UNIVERSE_SIZE)
+        # Root layer
+        packet[0:2] = (0x0010).to_bytes(2, 'big')  # preamble size
+        packet[4:16] = self.ACN_ID
+        packet[18:22] = self.VECTOR_ROOT_DATA.to_bytes(4, 'big')
+        packet[22:38] = self.cid
+        # Framing layer
+        packet[40:44] = self.VECTOR_FRAMING_DATA.to_bytes(4, 'big')
+        packet[44:108] = source_name.encode('utf-8')[:63].ljust(64, b'\x00')
+        packet[108] = priority
+        packet[109:111] = sync_universe.to_bytes(2, 'big')
+        packet[113:115] = universe.to_bytes(2, 'big')
+        # DMP layer
+        packet[117] = self.VECTOR_DMP_SET_PROPERTY
+        packet[118] = 0xA1  # address and data type
+        packet[121:123] = (0x0001).to_bytes(2, 'big')  # address increment
+        packet[125] = DMX_START_CODE
+        self._packet = packet
+        self._packet_view = memoryview(packet)
+        self._frame_slots = None
+        self._set_frame_slots(self.UNIVERSE_SIZE)
+        self._sequence = 0
+        
+        super().__init__(**kwargs)
+    
+    def _set_frame_slots(self, slots):
+        """Rewrite the three PDU lengths and the property count for a new frame length."""
+        total = self.HEADER_SIZE + slots
+        for offset in (16, 38, 115):
+            self._packet[offset:offset + 2] = (0x7000 | (total - offset)).to_bytes(2, 'big')
+        self._packet[123:125] = (slots + 1).to_bytes(2, 'big')
+        self._frame_view = self._packet_view[:total]
+        self._frame_slots = slots
+    
+    def _encode(self, data):
+        """Copy channel data into the persistent packet and return a view of the frame."""
+        slots = self.frame_slots
+        if slots != self._frame_slots:
+            self._set_frame_slots(slots)
+        if slots == self.UNIVERSE_SIZE:
+            self._packet[self.HEADER_SIZE:] = data
         else:
-            raise ValueError(f"Channel {channel} out of range (1-512)")
+            self._packet[self.HEADER_SIZE:self.HEADER_SIZE + slots] = data[:slots]
+        return self._frame_view
     
-    def send_dmx(self):
+    def _write_packet(self, packet):
+        """Stamp the next sequence number on the packet and send it."""
+        if packet is not self._frame_view:
+            # Snapshot packet: bring it into the buffer to set the sequence
+            self._packet[:len(packet)] = packet
+            packet = self._packet_view[:len(packet)]
+        self._sequence = (self._sequence + 1) & 0xFF
+        self._packet[self.SEQUENCE_OFFSET] = self._sequence
+        self.socket.sendto(packet, self.address)
+        self.frames_sent += 1
+    
+    def _close(self):
+        """Tell receivers the stream has ended, then close the socket if it is ours."""
+        self._packet[self.OPTIONS_OFFSET] = self.OPTION_STREAM_TERMINATED
+        for _ in range(3):  # E1.31 sends the termination three times
+            self._write_packet(self._frame_view)
+        self._packet[self.OPTIONS_OFFSET] = 0
+        if self._owns_socket:
+            self.socket.close()
+
+
+def sacn_multicast_address(universe):
+    """Multicast group for an sACN universe: 239.255.<universe high>.<universe low>."""
+    return f"239.255.{universe >> 8}.{universe & 0xFF}"
+
+
+def sacn_socket(multicast_ttl=1):
+    """UDP socket for sending sACN, with the multicast TTL set."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+    return sock
+
+
+class SACNSender:
+    """
+    Many sACN universes from one source, sharing a socket and CID.
+    
+    With a synchronization universe, receivers hold each universe's data
+    until the sync packet arrives, so a multi-universe frame latches
+    everywhere at once: call flush() to send every universe and then sync.
+    """
+    
+    VECTOR_ROOT_EXTENDED = 0x00000008
+    VECTOR_EXTENDED_SYNC = 0x00000001
+    SYNC_PACKET_SIZE = 49
+    
+    def __init__(self, source_name='dmxmdx', priority=100, sync_universe=0, host=None,
+                 port=SACNOutput.PORT, cid=None, multicast_ttl=1):
+        """
+        Initialize the sender.
+        
+        Args:
+            source_name: Name shown by receivers (default: dmxmdx)
+            priority: Default priority for new universes, 0-200 (default: 100)
+            sync_universe: Universe for sync packets (default: 0, no sync)
+            host: Unicast destination for all packets (default: multicast)
+            port: UDP port (default: 5568)
+            cid: 16-byte component identifier (default: random)
+            multicast_ttl: Multicast TTL (default: 1, local network only)
         """
-        Send current DMX data to the controller.
-        Uses Enttec DMX USB Pro protocol.
+        self.source_name = source_name
+        self.priority = priority
+        self.sync_universe = sync_universe
+        self.host = host
+        self.port = port
+        self.cid = cid or uuid.uuid4().bytes
+        self.socket = sacn_socket(multicast_ttl)
+        self.universes = {}
+        
+        # Pre-built synchronization packet; only the sequence number changes
+        sync = bytearray(self.SYNC_PACKET_SIZE)
+        sync[0:2] = (0x0010).to_bytes(2, 'big')
+        sync[4:16] = SACNOutput.ACN_ID
+        sync[16:18] = (0x7000 | (self.SYNC_PACKET_SIZE - 16)).to_bytes(2, 'big')
+        sync[18:22] = self.VECTOR_ROOT_EXTENDED.to_bytes(4, 'big')
+        sync[22:38] = self.cid
+        sync[38:40] = (0x7000 | (self.SYNC_PACKET_SIZE - 38)).to_bytes(2, 'big')
+        sync[40:44] = self.VECTOR_EXTENDED_SYNC.to_bytes(4, 'big')
+        sync[45:47] = sync_universe.to_bytes(2, 'big')
+        self._sync_packet = sync
+        self._sync_sequence = 0
+        self._sync_address = (host or sacn_multicast_address(sync_universe or 1), port)
+    
+    def add_universe(self, universe, priority=None, **kwargs):
         """
-        # Construct the message according to Enttec protocol
-        # Message structure: START_MSG | SEND_DMX | Length_LSB | Length_MSB | DMX_Data | END_MSG
-        data_length = len(self.dmx_data)
-        length_lsb = data_length & 0xFF
-        length_msb = (data_length >> 8) & 0xFF
+        Add a universe.
         
-        # Build the complete message
-        message = bytearray()
-        message.append(self.START_MSG)
-        message.append(self.SEND_DMX)
-        message.append(length_lsb)
-        message.append(length_msb)
-        message.extend(self.dmx_data)
-        message.append(self.END_MSG)
+        Args:
+            universe: sACN universe (1-63999)
+            priority: Priority for this universe (default: the sender's)
+            **kwargs: Output options (send_on_change, trim, ...), see DMXOutput
         
-        self.serial.write(message)
+        Returns:
+            The universe's SACNOutput
+        """
+        if universe in self.universes:
+            raise ValueError(f"Universe {universe} already added")
+        output = SACNOutput(universe, priority=self.priority if priority is None else priority,
+                            source_name=self.source_name, cid=self.cid,
+                            sync_universe=self.sync_universe, host=self.host,
+                            port=self.port, sock=self.socket, **kwargs)
+        self.universes[universe] = output
+        return output
     
-    def blackout(self):
-        """Turn off all channels."""
-        self.dmx_data = [0] * 512
-        self.send_dmx()
+    def __getitem__(self, universe):
+        return self.universes[universe]
+    
+    def send_sync(self):
+        """Send a synchronization packet, latching all universes sent since the last one."""
+        if not self.sync_universe:
+            return
+        self._sync_sequence = (self._sync_sequence + 1) & 0xFF
+        self._sync_packet[44] = self._sync_sequence
+        self.socket.sendto(self._sync_packet, self._sync_address)
+    
+    def flush(self):
+        """Send every universe, then the synchronization packet."""
+        for output in self.universes.values():
+            output.send_dmx()
+        self.send_sync()
     
     def close(self):
-        """Close the serial connection."""
-        self.blackout()
-        self.serial.close()
-        print("DMX controller disconnected")
+        """Black out and terminate every universe, then close the socket."""
+        for output in self.universes.values():
+            output.close()
+        self.send_sync()
+        self.socket.close()
+
+
+class DMXBridge:
+    """
+    Network-to-DMX node: receives Art-Net or sACN and forwards each mapped
+    universe to a DMX output (usually a DMXUSB widget).
+    
+    Packets are received into one reusable buffer and their payload is
+    copied straight into the output's universe. Bursts faster than an
+    output can send are coalesced: the newest data wins and is written as
+    soon as the output's frame interval allows.
+    """
+    
+    BUFFER_SIZE = 1024
+    ACN_ROOT_DATA = SACNOutput.VECTOR_ROOT_DATA.to_bytes(4, 'big')
+    ACN_FRAMING_DATA = SACNOutput.VECTOR_FRAMING_DATA.to_bytes(4, 'big')
+    
+    def __init__(self, protocol='artnet', bind='0.0.0.0', port=None):
+        """
+        Initialize the bridge.
+        
+        Args:
+            protocol: 'artnet' or 'sacn'
+            bind: Local address to listen on (default: all interfaces)
+            port: UDP port (default: 6454 for Art-Net, 5568 for sACN)
+        """
+        if protocol == 'artnet':
+            self._parse = self._parse_artnet
+            port = port or ArtNetOutput.PORT
+        elif protocol == 'sacn':
+            self._parse = self._parse_sacn
+            port = port or SACNOutput.PORT
+        else:
+            raise ValueError(f"Unknown protocol {protocol!r} (use 'artnet' or 'sacn')")
+        self.protocol = protocol
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((bind, port))
+        self.address = self.socket.getsockname()
+        
+        self._buffer = bytearray(self.BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self.routes = {}
+        self.latency = {}
+        self.packets_received = 0
+        self.packets_ignored = 0
+        self.packets_coalesced = 0
+        self._stop = threading.Event()
+        print(f"Bridging {protocol} on {self.address[0]}:{self.address[1]}")
+    
+    def map(self, universe, output, rate=None):
+        """
+        Forward a network universe to an output.
+        
+        Args:
+            universe: Art-Net port address (Net << 8 | SubUni) or sACN universe
+            output: DMXOutput that receives the data
+            rate: Maximum frames per second to write (default: the output's
+                max_frame_rate())
+        """
+        if universe in self.routes:
+            raise ValueError(f"Universe {universe} already mapped")
+        rate = rate or output.max_frame_rate()
+        self.routes[universe] = {
+            'output': output,
+            'interval_ns': int(1e9 / rate),
+            'last_write_ns': None,
+            'pending_since_ns': None,
+        }
+        self.latency[universe] = TimingStats()
+        if self.protocol == 'sacn':
+            # Join the universe's multicast group; unicast senders work without it
+            group = socket.inet_aton(sacn_multicast_address(universe)) + socket.inet_aton('0.0.0.0')
+            try:
+                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, group)
+            except OSError as e:
+                print(f"Could not join multicast group for universe {universe}: {e}")
+    
+    def _parse_artnet(self, view, nbytes):
+        """Return (universe, data offset, length) for an ArtDmx packet, else None."""
+        if (nbytes < ArtNetOutput.HEADER_SIZE or view[:8] != ArtNetOutput.ID
+                or view[8] | view[9] << 8 != ArtNetOutput.OP_DMX):
+            return None
+        length = min(view[16] << 8 | view[17], nbytes - ArtNetOutput.HEADER_SIZE, 512)
+        return view[14] | view[15] << 8, ArtNetOutput.HEADER_SIZE, length
+    
+    def _parse_sacn(self, view, nbytes):
+        """Return (universe, data offset, length) for an E1.31 data packet, else None."""
+        if (nbytes < SACNOutput.HEADER_SIZE or view[4:16] != SACNOutput.ACN_ID
+                or view[18:22] != self.ACN_ROOT_DATA or view[40:44] != self.ACN_FRAMING_DATA):
+            return None
+        # Skip preview data, stream termination and non-zero start codes
+        if view[SACNOutput.OPTIONS_OFFSET] & 0xC0 or view[125] != DMX_START_CODE:
+            return None
+        length = min((view[123] << 8 | view[124]) - 1, nbytes - SACNOutput.HEADER_SIZE, 512)
+        return view[113] << 8 | view[114], SACNOutput.HEADER_SIZE, length
+    
+    def poll(self, timeout=None):
+        """
+        Receive at most one packet, then write every output that is due.
+        
+        Args:
+            timeout: Longest time to wait for a packet in seconds (None: until
+                a packet arrives or a coalesced frame is due)
+        
+        Returns:
+            True if a packet was received for a mapped universe
+        """
+        now = time.perf_counter_ns()
+        wait = timeout
+        for route in self.routes.values():
+            if route['pending_since_ns'] is not None:
+                due = (route['last_write_ns'] + route['interval_ns'] - now) / 1e9
+                wait = due if wait is None else min(wait, due)
+        self.socket.settimeout(max(wait, 0) if wait is not None else None)
+        
+        try:
+            nbytes = self.socket.recv_into(self._buffer)
+        except (socket.timeout, BlockingIOError):
+            nbytes = 0
+        received = time.perf_counter_ns()
+        
+        forwarded = False
+        if nbytes:
+            self.packets_received += 1
+            parsed = self._parse(self._view, nbytes)
+            route = self.routes.get(parsed[0]) if parsed else None
+            if route is None:
+                self.packets_ignored += 1
+            else:
+                universe, offset, length = parsed
+                route['output'].set_channels(1, self._view[offset:offset + length])
+                if route['pending_since_ns'] is None:
+                    route['pending_since_ns'] = received
+                else:
+                    self.packets_coalesced += 1
+                forwarded = True
+        
+        self._write_due(received)
+        return forwarded
+    
+    def _write_due(self, now):
+        """Write every output with pending data whose frame interval has passed."""
+        for universe, route in self.routes.items():
+            pending = route['pending_since_ns']
+            if pending is None:
+                continue
+            last = route['last_write_ns']
+            if last is not None and now - last < route['interval_ns']:
+                continue
+            route['output'].send_dmx()
+            written = time.perf_counter_ns()
+            # Latency of the oldest packet folded into this frame
+            self.latency[universe].add((written - pending) / 1e9)
+            route['last_write_ns'] = now
+            route['pending_since_ns'] = None
+    
+    def run(self, duration=None):
+        """
+        Forward packets until stop() is called or duration seconds pass.
+        
+        Args:
+            duration: Time to run in seconds (default: until stopped)
+        """
+        self._stop.clear()
+        end = time.perf_counter() + duration if duration is not None else None
+        try:
+            while not self._stop.is_set():
+                if end is not None and time.perf_counter() >= end:
+                    break
+                self.poll(timeout=0.1)
+        except KeyboardInterrupt:
+            print("\nBridge interrupted by user")
+    
+    def stop(self):
+        """Stop a running run() loop."""
+        self._stop.set()
+    
+    def stats(self):
+        """Packet counters and per-universe receive-to-write latency, as plain dicts."""
+        return {
+            'packets': self.packets_received,
+            'ignored': self.packets_ignored,
+            'coalesced': self.packets_coalesced,
+            'latency': {universe: stats.as_dict() for universe, stats in self.latency.items()},
+        }
+    
+    def close(self):
+        """Close the socket. Mapped outputs stay open and belong to the caller."""
+        self.socket.close()
+
+
+class UniverseManager:
+    """
+    Several DMX outputs in one process, keyed by universe ID.
+    
+    A tick renders all universes, then flushes them in parallel: every
+    universe's serial write runs on its own worker thread, so universe N
+    never waits for universe N-1's write to finish.
+    """
+    
+    def __init__(self):
+        self.universes = {}
+        self.write_stats = {}
+        self.render_stats = TimingStats()
+        self.flush_stats = TimingStats()
+        self._executor = None
+    
+    def add(self, universe_id, output=None, port=None, **kwargs):
+        """
+        Add a universe.
+        
+        Args:
+            universe_id: Key for the universe (e.g. 1-16)
+            output: Existing DMXUSB instance, or None to open one on port
+            port: Serial port path for a new DMXUSB
+            **kwargs: Extra DMXUSB arguments (send_on_change, trim, ...)
+        
+        Returns:
+            The universe's output
+        """
+        if universe_id in self.universes:
+            raise ValueError(f"Universe {universe_id} already added")
+        if output is None:
+            if port is None:
+                raise ValueError(f"Universe {universe_id} needs an output or a port")
+            output = DMXUSB(port=port, **kwargs)
+        self.universes[universe_id] = output
+        self.write_stats[universe_id] = TimingStats()
+        
+        # One worker per universe so every write can run at the same time
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.universes),
+                                            thread_name_prefix="dmx-universe")
+        return output
+    
+    def __getitem__(self, universe_id):
+        return self.universes[universe_id]
+    
+    def _send(self, universe_id):
+        """Send one universe and record how long its write took."""
+        start = time.perf_counter()
+        self.universes[universe_id].send_dmx()
+        self.write_stats[universe_id].add(time.perf_counter() - start)
+    
+    def flush(self):
+        """Send every universe in parallel and wait for all writes to finish."""
+        if not self.universes:
+            return
+        start = time.perf_counter()
+        futures = [self._executor.submit(self._send, universe_id) for universe_id in self.universes]
+        for future in futures:
+            future.result()
+        self.flush_stats.add(time.perf_counter() - start)
+    
+    def tick(self, render=None):
+        """
+        Render and flush one frame across all universes.
+        
+        Args:
+            render: Optional callable taking this manager that writes channel
+                data for the frame, e.g. manager[2].set_channels(...)
+        """
+        if render is not None:
+            start = time.perf_counter()
+            render(self)
+            self.render_stats.add(time.perf_counter() - start)
+        self.flush()
+    
+    def stats(self):
+        """Per-universe write timing plus render and flush timing, as plain dicts."""
+        return {
+            'universes': {universe_id: stats.as_dict() for universe_id, stats in self.write_stats.items()},
+            'render': self.render_stats.as_dict(),
+            'flush': self.flush_stats.as_dict(),
+        }
+    
+    def close(self):
+        """Close every universe's output."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for output in self.universes.values():
+            output.close()
 
 
 class BeamZLEDPar:
@@ -103,16 +2746,26 @@ class BeamZLEDPar:
     For white light, all RGB channels should be set to 255.
     """
     
+    CHANNEL_COUNT = 6
+    
+    # Key for this fixture's strobe calibration (see StrobeCalibration)
+    PROFILE = 'beamz-ledpar-12-6ch'
+    
+    # Full channel blocks: dimmer, R, G, B, strobe, mode
+    WHITE_FULL = bytes([255, 255, 255, 255, 0, 0])  # White = R+G+B at full
+    BLACKOUT = bytes(CHANNEL_COUNT)
+    
     def __init__(self, dmx_controller, start_channel=1):
         """
         Initialize BeamZ LED Par 12 LEDs controller.
         
         Args:
-            dmx_controller: DMXUSB instance
+            dmx_controller: DMX output (DMXUSB, ArtNetOutput, ...)
             start_channel: Starting DMX channel for this fixture (default: 1)
         """
         self.dmx = dmx_controller
         self.start_channel = start_channel
+        self.dmx.patch(start_channel, self.CHANNEL_COUNT)
     
     def set_dimmer(self, value):
         """Set master dimmer (0-255)."""
@@ -120,9 +2773,7 @@ class BeamZLEDPar:
     
     def set_rgb(self, red, green, blue):
         """Set RGB values (0-255 each)."""
-        self.dmx.set_channel(self.start_channel + 1, red)
-        self.dmx.set_channel(self.start_channel + 2, green)
-        self.dmx.set_channel(self.start_channel + 3, blue)
+        self.dmx.set_channels(self.start_channel + 1, (red, green, blue))
     
     def set_strobe(self, value):
         """Set strobe speed (0=off, 1-255=slow to fast)."""
@@ -134,18 +2785,337 @@ class BeamZLEDPar:
     
     def white_full(self):
         """Turn on white at full brightness (all RGB at 255)."""
-        self.set_dimmer(255)
-        self.set_rgb(255, 255, 255)  # White = R+G+B at full
-        self.set_strobe(0)
-        self.set_mode(0)
+        self.dmx.set_channels(self.start_channel, self.WHITE_FULL)
     
     def blackout(self):
         """Turn off all channels for this fixture."""
-        for i in range(6):
-            self.dmx.set_channel(self.start_channel + i, 0)
+        self.dmx.set_channels(self.start_channel, self.BLACKOUT)
+
+
+class StrobeCalibration:
+    """
+    Maps a fixture profile's strobe channel values to measured flash rates.
+    
+    Fixture strobe channels are only labelled "slow to fast", so the curve
+    has to be measured once per profile (see calibrate_strobe()). Points are
+    interpolated linearly and stored per profile in a JSON file.
+    """
+    
+    DEFAULT_FILE = os.path.join(STATE_DIR, 'strobe_calibration.json')
+    
+    def __init__(self, profile, points=None):
+        """
+        Initialize a calibration.
+        
+        Args:
+            profile: Fixture profile name (e.g. BeamZLEDPar.PROFILE)
+            points: Optional iterable of (channel value, measured Hz) pairs
+        """
+        self.profile = profile
+        self.points = []
+        for value, hz in points or ():
+            self.add_point(value, hz)
+    
+    def add_point(self, value, hz):
+        """Record the flash rate measured at a strobe channel value (1-255)."""
+        if not 1 <= value <= 255:
+            raise ValueError(f"Strobe value {value} out of range (1-255)")
+        self.points = sorted([p for p in self.points if p[0] != value] + [(value, float(hz))])
+    
+    def hz_for(self, value):
+        """Interpolated flash rate for a strobe channel value (None if uncalibrated)."""
+        if not self.points:
+            return None
+        if value <= self.points[0][0]:
+            return self.points[0][1]
+        for (v0, hz0), (v1, hz1) in zip(self.points, self.points[1:]):
+            if value <= v1:
+                return hz0 + (hz1 - hz0) * (value - v0) / (v1 - v0)
+        return self.points[-1][1]
+    
+    def value_for(self, hz):
+        """
+        Find the strobe channel value closest to a target frequency.
+        
+        Returns:
+            (value, relative error) tuple, or (None, None) if uncalibrated
+        """
+        if not self.points:
+            return None, None
+        value = min(range(1, 256), key=lambda v: abs(self.hz_for(v) - hz))
+        return value, abs(self.hz_for(value) - hz) / hz
+    
+    def save(self, path=DEFAULT_FILE):
+        """Store this profile's points, keeping other profiles already in the file."""
+        data = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+        data[self.profile] = [list(point) for point in self.points]
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    @classmethod
+    def load(cls, profile, path=DEFAULT_FILE):
+        """Load a profile's calibration (None if the file or profile is missing)."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if profile not in data:
+            return None
+        return cls(profile, data[profile])
+
+
+def calibrate_strobe(dmx_controller, fixture, measure, values=(1, 32, 64, 96, 128, 160, 192, 224, 255)):
+    """
+    Measure a fixture's hardware strobe rate at several channel values.
+    
+    For each value the fixture is set to full white with the strobe channel
+    at that value, and measure(value) is called to obtain the flash rate in
+    Hz, e.g. from a photodiode or by counting flashes over a few seconds.
+    
+    Args:
+        dmx_controller: DMXUSB instance
+        fixture: Fixture with white_full(), set_strobe(), blackout() and PROFILE
+        measure: Callable taking the strobe value and returning the measured Hz
+        values: Strobe channel values to measure
+    
+    Returns:
+        StrobeCalibration for the fixture's profile (call save() to store it)
+    """
+    calibration = StrobeCalibration(fixture.PROFILE)
+    try:
+        for value in values:
+            fixture.white_full()
+            fixture.set_strobe(value)
+            dmx_controller.send_dmx()
+            calibration.add_point(value, measure(value))
+    finally:
+        fixture.blackout()
+        dmx_controller.send_dmx()
+    return calibration
+
+
+class StrobeEngine:
+    """
+    Software strobe for any number of fixtures.
+    
+    Each fixture gets its own frequency, duty cycle and phase offset. All
+    flips are merged into a single frame schedule, so fixtures that change
+    state at the same instant share one serial write: strobing 40 pars in
+    sync costs the same number of frames as strobing one.
+    """
+    
+    DEFAULT_DUTY_CYCLE = 0.5
+    
+    def __init__(self, dmx_controller, spin=0.0):
+        """
+        Initialize the strobe engine.
+        
+        Args:
+            dmx_controller: DMXUSB instance
+            spin: Busy-wait this many seconds before each flip for sub-millisecond
+                timing (default: 0.0, sleep only)
+        """
+        self.dmx = dmx_controller
+        self.spin = spin
+        self.strobes = []
+        self.hardware_strobes = []
+    
+    def add(self, fixture, frequency, duty_cycle=DEFAULT_DUTY_CYCLE, phase=0.0, on=None, off=None,
+            calibration=None, tolerance=0.05, hardware=None):
+        """
+        Add a fixture to the strobe.
+        
+        Args:
+            fixture: Fixture instance (e.g. BeamZLEDPar)
+            frequency: Flashes per second
+            duty_cycle: Fraction of each cycle the fixture is on (default: 0.5)
+            phase: Offset of the flash within the cycle, as a fraction of a
+                cycle (default: 0.0, on at the start)
+            on: Callable that turns the fixture on (default: fixture.white_full)
+            off: Callable that turns the fixture off (default: fixture.blackout)
+            calibration: StrobeCalibration for the fixture's profile; if its
+                strobe channel can hit the frequency within tolerance, the
+                fixture strobes in hardware and costs no frames at all
+            tolerance: Maximum relative frequency error for hardware strobing
+                (default: 0.05)
+            hardware: A fixture's strobe channel sets only the frequency, not
+                duty cycle or phase. None (default) uses hardware strobing
+                only for the default duty cycle with no phase offset; True
+                uses it whenever the frequency is reachable, ignoring
+                duty_cycle and phase; False always strobes in software
+        
+        Returns:
+            'hardware' or 'software', the way the fixture will strobe
+        """
+        if frequency <= 0:
+            raise ValueError(f"Strobe frequency must be positive, got {frequency}")
+        if not 0 < duty_cycle < 1:
+            raise ValueError(f"Duty cycle must be between 0 and 1, got {duty_cycle}")
+        
+        if hardware is None:
+            hardware = duty_cycle == self.DEFAULT_DUTY_CYCLE and phase % 1.0 == 0
+        if calibration is not None and hardware:
+            value, error = calibration.value_for(frequency)
+            if value is not None and error <= tolerance:
+                self.hardware_strobes.append({
+                    'fixture': fixture,
+                    'value': value,
+                    'on': on or fixture.white_full,
+                    'off': off or fixture.blackout,
+                })
+                return 'hardware'
+        
+        self.strobes.append({
+            'fixture': fixture,
+            'frequency': frequency,
+            'duty_cycle': duty_cycle,
+            'phase': phase % 1.0,
+            'on': on or fixture.white_full,
+            'off': off or fixture.blackout,
+        })
+        return 'software'
+    
+    def _is_on(self, strobe, t):
+        """Whether a strobe is in its on period at t seconds."""
+        return (t * strobe['frequency'] - strobe['phase']) % 1.0 < strobe['duty_cycle']
+    
+    def _flips(self, index, duration_us):
+        """Yield (time_us, index, on) for every state change of one strobe in (0, duration)."""
+        strobe = self.strobes[index]
+        period = 1.0 / strobe['frequency']
+        cycle = -1
+        while True:
+            cycle_start = (cycle + strobe['phase']) * period
+            for offset, on in ((0.0, True), (strobe['duty_cycle'] * period, False)):
+                # Round to whole microseconds so flips that coincide mathematically
+                # land in the same frame despite floating point error
+                t_us = round((cycle_start + offset) * 1e6)
+                if t_us >= duration_us:
+                    return
+                if t_us > 0:
+                    yield t_us, index, on
+            cycle += 1
+    
+    def schedule(self, duration):
+        """
+        Compute the merged frame schedule.
+        
+        Args:
+            duration: Length of the strobe in seconds
+        
+        Yields:
+            (time, changes) tuples in time order, where time is in seconds and
+            changes is a list of (strobe, on) pairs that flip in that frame
+        """
+        duration_us = round(duration * 1e6)
+        flips = heapq.merge(*(self._flips(i, duration_us) for i in range(len(self.strobes))))
+        current_us = None
+        changes = []
+        for t_us, index, on in flips:
+            if t_us != current_us and changes:
+                yield current_us / 1e6, changes
+                changes = []
+            current_us = t_us
+            changes.append((self.strobes[index], on))
+        if changes:
+            yield current_us / 1e6, changes
+    
+    def run(self, duration):
+        """
+        Run the strobe, then black out all fixtures.
+        
+        Args:
+            duration: How long to run the strobe in seconds
+        
+        Returns:
+            Dict with the number of frames sent plus DeadlineScheduler overrun statistics
+        """
+        scheduler = DeadlineScheduler(spin=self.spin)
+        frames = 0
+        try:
+            self._set_initial_states()
+            self.dmx.send_dmx()
+            frames += 1
+            
+            for t, changes in self.schedule(duration):
+                scheduler.wait_until(t)
+                self._apply(changes)
+                self.dmx.send_dmx()
+                frames += 1
+            scheduler.wait_until(duration)
+        
+        finally:
+            self._all_off()
+            self.dmx.send_dmx()
+        
+        stats = scheduler.stats()
+        stats['frames'] = frames
+        return stats
+    
+    async def run_async(self, duration):
+        """
+        Run the strobe as a coroutine, then black out all fixtures.
+        
+        Waits with asyncio.sleep on absolute event loop deadlines and sends
+        with send_dmx_async(), so many strobes can share one event loop.
+        
+        Args:
+            duration: How long to run the strobe in seconds
+        
+        Returns:
+            Dict with the number of frames sent plus overrun statistics
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        lateness = TimingStats()
+        overruns = 0
+        frames = 0
+        try:
+            self._set_initial_states()
+            await self.dmx.send_dmx_async()
+            frames += 1
+            
+            for t, changes in self.schedule(duration):
+                delay = start + t - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    overruns += 1
+                lateness.add(max(0.0, loop.time() - start - t))
+                self._apply(changes)
+                await self.dmx.send_dmx_async()
+                frames += 1
+            await asyncio.sleep(max(0.0, start + duration - loop.time()))
+        
+        finally:
+            self._all_off()
+            await self.dmx.send_dmx_async()
+        
+        return {'frames': frames, 'overruns': overruns, 'lateness': lateness.as_dict()}
+    
+    def _set_initial_states(self):
+        """Switch hardware strobes on and put every software strobe in its state at t=0."""
+        for strobe in self.hardware_strobes:
+            strobe['on']()
+            strobe['fixture'].set_strobe(strobe['value'])
+        for strobe in self.strobes:
+            (strobe['on'] if self._is_on(strobe, 0.0) else strobe['off'])()
+    
+    def _apply(self, changes):
+        """Flip the strobes changing in one frame."""
+        for strobe, on in changes:
+            (strobe['on'] if on else strobe['off'])()
+    
+    def _all_off(self):
+        """Turn every fixture off."""
+        for strobe in self.hardware_strobes + self.strobes:
+            strobe['off']()
 
 
-def strobe_8hz(dmx_controller, par_light, duration=10):
+def strobe_8hz(dmx_controller, par_light, duration=10, spin=0.0):
     """
     Create an 8Hz white strobe effect.
     
@@ -153,38 +3123,52 @@ def strobe_8hz(dmx_controller, par_light, duration=10):
         dmx_controller: DMXUSB instance
         par_light: BeamZLEDPar instance
         duration: How long to run the strobe in seconds (default: 10)
+        spin: Busy-wait this many seconds before each flip for sub-millisecond
+            timing (default: 0.0, sleep only)
+    
+    Returns:
+        Frame count and DeadlineScheduler overrun statistics (None if interrupted)
     """
     print(f"Starting 8Hz white strobe for {duration} seconds...")
     print("Press Ctrl+C to stop early")
     
     # 8Hz = 8 flashes per second = 0.125 seconds per cycle
-    # Each cycle has ON and OFF period
-    cycle_time = 1.0 / 8.0  # 0.125 seconds
-    on_time = cycle_time / 2  # 50% duty cycle
-    off_time = cycle_time / 2
-    
-    start_time = time.time()
+    # Each cycle has ON and OFF period (50% duty cycle)
+    engine = StrobeEngine(dmx_controller, spin=spin)
+    engine.add(par_light, frequency=8.0, duty_cycle=0.5)
+    stats = None
     
     try:
-        while (time.time() - start_time) < duration:
-            # Turn white ON
-            par_light.white_full()
-            dmx_controller.send_dmx()
-            time.sleep(on_time)
-            
-            # Turn OFF
-            par_light.blackout()
-            dmx_controller.send_dmx()
-            time.sleep(off_time)
+        stats = engine.run(duration)
     
     except KeyboardInterrupt:
         print("\nStrobe interrupted by user")
     
     finally:
-        # Ensure light is off when done
-        par_light.blackout()
-        dmx_controller.send_dmx()
-        print("Strobe stopped")
+        # The engine leaves the light off when done
+        if stats is not None:
+            print(f"Strobe stopped ({stats['frames']} frames, {stats['overruns']} overruns)")
+        else:
+            print("Strobe stopped")
+    
+    return stats
+
+
+async def strobe_8hz_async(dmx_controller, par_light, duration=10):
+    """
+    Create an 8Hz white strobe effect as a coroutine.
+    
+    Args:
+        dmx_controller: DMXUSB instance (see DMXUSB.open_async)
+        par_light: BeamZLEDPar instance
+        duration: How long to run the strobe in seconds (default: 10)
+    
+    Returns:
+        Frame count and overrun statistics
+    """
+    engine = StrobeEngine(dmx_controller)
+    engine.add(par_light, frequency=8.0, duty_cycle=0.5)
+    return await engine.run_async(duration)
 
 
 def main():
@@ -197,12 +3181,13 @@ def main():
     print()
     
     # Configuration
-    SERIAL_PORT = '/dev/ttyUSB0'  # Change if your device is on a different port
+    SERIAL_PORT = None             # Set to e.g. '/dev/ttyUSB0' to skip auto-discovery
     PAR_DMX_ADDRESS = 1            # DMX start address of your BeamZ LED Par 12 LEDs
     STROBE_DURATION = 10           # Strobe duration in seconds
     
-    # Initialize DMX controller
-    dmx = DMXUSB(port=SERIAL_PORT)
+    # Initialize DMX controller: cached widget port, else probe connected devices
+    port = SERIAL_PORT or find_widget() or '/dev/ttyUSB0'
+    dmx = DMXUSB(port=port)
     
     # Initialize BeamZ LED Par 12 LEDs (6-channel mode)
     par = BeamZLEDPar(dmx, start_channel=PAR_DMX_ADDRESS)
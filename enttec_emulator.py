@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Enttec DMX USB Pro emulator on a pseudo-terminal (Linux, no hardware required).
+
+The emulator opens a PTY, decodes the Enttec messages written to it and
+simulates the widget's DMX line: every frame occupies the 250 kbaud line
+for break + mark-after-break + 44 us per slot, and a packet that arrives
+while an earlier one is still waiting for the line replaces it (the waiting
+one is counted as dropped). Frame timestamps are recorded, so DMXUSB can be
+benchmarked end to end: achieved fps, jitter, latency and dropped frames.
+
+Run it standalone and point dmx_strobe.py at the printed port:
+    python3 enttec_emulator.py
+"""
+
+import os
+import select
+import threading
+import time
+import tty
+
+from dmx_strobe import (DMX_BREAK_US, DMX_MAB_US, DMX_SLOT_US, DMXUSB, EnttecParser,
+                        TimingStats, _enttec_message)
+
+
+class EnttecEmulator:
+    """
+    Emulated Enttec DMX USB Pro widget on a pseudo-terminal.
+
+    Open port (the PTY slave) like a real widget. Each DMX frame that makes
+    it onto the emulated line is recorded in frames as a (received_ns,
+    start_ns, end_ns, slots) tuple, in perf_counter_ns time.
+    """
+
+    FIRMWARE = 0x0144
+    SERIAL_NUMBER = bytes([0x78, 0x56, 0x34, 0x12])  # BCD, least significant first: 12345678
+
+    def __init__(self, break_us=DMX_BREAK_US, mab_us=DMX_MAB_US, rate=0,
+                 serial_number=SERIAL_NUMBER):
+        """
+        Initialize the emulator and open its pseudo-terminal.
+
+        Args:
+            break_us: Break time in microseconds (default: 176)
+            mab_us: Mark-after-break time in microseconds (default: 12)
+            rate: Output rate limit in frames per second, 0 for none (default: 0)
+            serial_number: 4 BCD bytes reported to label 10
+        """
+        self.break_us = break_us
+        self.mab_us = mab_us
+        self.rate = rate
+        self.serial_number = serial_number
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)  # pass bytes through untouched (no newline or echo handling)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.parser = EnttecParser()
+        self.dmx_data = bytearray(DMXUSB.UNIVERSE_SIZE)
+        self._read_buffer = bytearray(4096)
+        self._read_view = memoryview(self._read_buffer)
+
+        # Simulated DMX line: when it is free again, and the packet waiting for it
+        self.frames = []
+        self.frames_dropped = 0
+        self._line_free_ns = 0
+        self._pending = None
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def frame_time_ns(self, slots):
+        """Time a frame of this many slots occupies the line (or the rate limit, if longer)."""
+        duration = round((self.break_us + self.mab_us + (1 + slots) * DMX_SLOT_US) * 1000)
+        if self.rate:
+            duration = max(duration, round(1e9 / self.rate))
+        return duration
+
+    def start(self):
+        """Start decoding in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="enttec-emulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the decoding thread and put any waiting frame on the line."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._advance(float('inf'))
+
+    def close(self):
+        """Stop and close the pseudo-terminal."""
+        self.stop()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def _run(self):
+        """Read from the PTY master until stopped."""
+        while not self._stop.is_set():
+            if not select.select([self.master_fd], [], [], 0.05)[0]:
+                continue
+            try:
+                count = os.readv(self.master_fd, [self._read_buffer])
+            except OSError:
+                break  # slave side closed
+            self.feed(self._read_view[:count], time.perf_counter_ns())
+
+    def feed(self, data, received_ns):
+        """
+        Decode bytes written to the widget at received_ns.
+
+        Args:
+            data: Bytes from the host
+            received_ns: perf_counter_ns arrival time
+        """
+        for label, payload in self.parser.feed(data):
+            if label == DMXUSB.SEND_DMX:
+                self._on_dmx(payload, received_ns)
+            elif label == DMXUSB.GET_WIDGET_PARAMS:
+                self._reply(label, bytes([self.FIRMWARE & 0xFF, self.FIRMWARE >> 8,
+                                          round(self.break_us / DMXUSB.WIDGET_TIME_UNIT_US),
+                                          round(self.mab_us / DMXUSB.WIDGET_TIME_UNIT_US),
+                                          self.rate]))
+            elif label == DMXUSB.SET_WIDGET_PARAMS and len(payload) >= 5:
+                self.break_us = payload[2] * DMXUSB.WIDGET_TIME_UNIT_US
+                self.mab_us = payload[3] * DMXUSB.WIDGET_TIME_UNIT_US
+                self.rate = payload[4]
+            elif label == DMXUSB.GET_WIDGET_SERIAL:
+                self._reply(label, self.serial_number)
+
+    def _reply(self, label, data):
+        """Send a message back to the host."""
+        os.write(self.master_fd, _enttec_message(label, data))
+
+    def _on_dmx(self, payload, received_ns):
+        """Queue a DMX packet for the line; a packet still waiting for the line is dropped."""
+        if not payload or payload[0] != 0:
+            return  # only start code 0 frames are emulated
+        slots = min(len(payload) - 1, DMXUSB.UNIVERSE_SIZE)
+        self.dmx_data[:slots] = payload[1:1 + slots]
+        self._advance(received_ns)
+        if self._line_free_ns <= received_ns:
+            self._transmit(received_ns, received_ns, slots)
+            return
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = (received_ns, slots)
+
+    def _advance(self, now_ns):
+        """Put the waiting packet on the line if the line has come free by now_ns."""
+        if self._pending is not None and self._line_free_ns <= now_ns:
+            received_ns, slots = self._pending
+            self._pending = None
+            self._transmit(received_ns, self._line_free_ns, slots)
+
+    def _transmit(self, received_ns, start_ns, slots):
+        """Record a frame on the line and mark the line busy until it ends."""
+        end_ns = start_ns + self.frame_time_ns(slots)
+        self.frames.append((received_ns, start_ns, end_ns, slots))
+        self._line_free_ns = end_ns
+
+    def stats(self):
+        """
+        Line statistics for the recorded frames.
+
+        Returns:
+            Dict with frames, dropped, fps (frames per second of line time),
+            jitter (largest minus smallest interval between frame starts, in
+            seconds), and interval and latency (received to line start) as
+            plain dicts
+        """
+        interval = TimingStats()
+        latency = TimingStats()
+        for index, (received_ns, start_ns, _, _) in enumerate(self.frames):
+            latency.add((start_ns - received_ns) / 1e9)
+            if index:
+                interval.add((start_ns - self.frames[index - 1][1]) / 1e9)
+        fps = None
+        if len(self.frames) > 1:
+            fps = (len(self.frames) - 1) / ((self.frames[-1][1] - self.frames[0][1]) / 1e9)
+        return {
+            'frames': len(self.frames),
+            'dropped': self.frames_dropped,
+            'fps': fps,
+            'jitter': interval.max - interval.min if interval.count else None,
+            'interval': interval.as_dict(),
+            'latency': latency.as_dict(),
+        }
+
+
+def main():
+    """Run the emulator until Ctrl+C, then print line statistics."""
+    emulator = EnttecEmulator()
+    emulator.start()
+    print(f"Emulated DMX USB Pro on {emulator.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator.close()
+    print(emulator.stats())
+
+
+if __name__ == "__main__":
+    main()
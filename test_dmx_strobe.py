@@ -4,22 +4,70 @@ Test script for DMX strobe controller (no hardware required).
 This tests the logic without needing actual DMX hardware.
 """
 
+import asyncio
+import os
+import select
+import socket
 import sys
+import tempfile
+import threading
 import time
 
 # Mock serial module for testing
 class MockSerial:
-    def __init__(self, port, baudrate, timeout):
+    # Serial numbers reported to "Get Widget Serial Number" (label 10), by port
+    serial_numbers = {}
+    # Ports that fail to open, as if unplugged
+    unplugged = set()
+    
+    def __init__(self, port, baudrate, timeout, **kwargs):
+        if port in self.unplugged:
+            raise OSError(f"[MOCK] No device on {port}")
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.is_open = True
+        self.last_write = None
+        self.write_count = 0
+        self.writes = []
+        self.breaks = 0
+        self._break_condition = False
+        self.read_buffer = bytearray()
         print(f"[MOCK] Connected to {port} at {baudrate} baud")
     
     def write(self, data):
         # Just track that we're sending data
+        assert not self._break_condition, "Data written during a break would be lost"
+        self.last_write = bytes(data)
+        self.write_count += 1
+        self.writes.append(self.last_write)
+        if self.last_write[:2] == bytes([0x7E, 0x0A]) and self.port in self.serial_numbers:
+            self.read_buffer += bytes([0x7E, 0x0A, 4, 0]) + self.serial_numbers[self.port] + bytes([0xE7])
         return len(data)
     
+    @property
+    def in_waiting(self):
+        return len(self.read_buffer)
+    
+    def read(self, size=1):
+        # Return queued widget replies
+        data = bytes(self.read_buffer[:size])
+        del self.read_buffer[:size]
+        return data
+    
+    @property
+    def break_condition(self):
+        return self._break_condition
+    
+    @break_condition.setter
+    def break_condition(self, value):
+        assert value != self._break_condition, "Break condition set twice"
+        self._break_condition = value
+        self.breaks += value
+    
+    def flush(self):
+        pass
+    
     def close(self):
         self.is_open = False
         print("[MOCK] Serial port closed")
@@ -151,6 +199,1144 @@ def test_multiple_fixtures():
     print("✓ Multiple fixtures test passed")
 
 
+def test_packet_buffer():
+    """Test persistent Enttec packet buffer."""
+    print("\n--- Test 7: Packet Buffer ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    packet = dmx._packet
+    
+    dmx.set_channel(1, 255)
+    dmx.set_channel(512, 64)
+    dmx.send_dmx()
+    sent = dmx.serial.last_write
+    assert sent[:4] == bytes([0x7E, 0x06, 0x01, 0x02]), "Header should be label 6 with length 513"
+    assert sent[4] == 0x00, "DMX start code should follow the header"
+    assert sent[5] == 255, "Channel 1 should follow the start code"
+    assert sent[516] == 64, "Channel 512 should be the last data byte"
+    assert sent[-1] == 0xE7, "Packet should end with END_MSG"
+    assert len(sent) == 518, "Packet should be header + start code + 512 channels + trailer"
+    
+    # The same buffer is reused for every frame
+    dmx.set_channel(1, 0)
+    dmx.send_dmx()
+    assert dmx._packet is packet, "Packet buffer should be reused"
+    assert dmx.serial.last_write[5] == 0, "Reused packet should carry the new data"
+    
+    dmx.close()
+    print("✓ Packet buffer test passed")
+
+
+def test_universe_storage():
+    """Test compact in-place universe storage."""
+    print("\n--- Test 8: Universe Storage ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    universe = dmx.dmx_data
+    assert isinstance(universe, bytearray), "Universe should be a bytearray"
+    
+    # Slice writes and reads
+    dmx.dmx_data[0:4] = [255, 10, 20, 30]
+    assert list(dmx.dmx_data[0:4]) == [255, 10, 20, 30], "Slice write should update channels 1-4"
+    
+    # Slice writes can't change the universe size
+    try:
+        dmx.dmx_data[0:4] = [1, 2]
+        assert False, "Resizing slice write should be rejected"
+    except BufferError:
+        pass
+    assert len(dmx.dmx_data) == 512, "Universe should stay 512 channels"
+    
+    # Blackout clears in place
+    dmx.blackout()
+    assert dmx.dmx_data is universe, "Blackout should not replace the universe"
+    assert not any(dmx.dmx_data), "All channels should be 0 after blackout"
+    
+    dmx.close()
+    print("✓ Universe storage test passed")
+
+
+def test_output_thread():
+    """Test background fixed-rate output with double buffering."""
+    print("\n--- Test 9: Output Thread ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    dmx.start_output(rate=100)
+    assert dmx.output_running, "Output thread should be running"
+    
+    # Writes to the back buffer are not visible until committed
+    dmx.set_channel(1, 200)
+    time.sleep(0.05)
+    assert dmx.serial.last_write[5] == 0, "Uncommitted data should not be sent"
+    
+    dmx.send_dmx()  # commits while the thread is running
+    time.sleep(0.05)
+    assert dmx.serial.last_write[5] == 200, "Committed data should be sent"
+    
+    # Frames keep flowing at the configured rate without send_dmx calls
+    count = dmx.serial.write_count
+    time.sleep(0.2)
+    sent = dmx.serial.write_count - count
+    assert 10 <= sent <= 30, f"Expected ~20 frames in 0.2s at 100 Hz, got {sent}"
+    
+    dmx.stop_output()
+    assert not dmx.output_running, "Output thread should be stopped"
+    
+    dmx.close()
+    print(f"✓ Output thread test passed ({sent} frames in 0.2s)")
+
+
+def test_send_on_change():
+    """Test suppression of unchanged frames with keepalive."""
+    print("\n--- Test 10: Send On Change ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0', send_on_change=True, keepalive=0.1)
+    
+    assert dmx.send_dmx(), "First frame should always be sent"
+    assert not dmx.send_dmx(), "Unchanged frame should be suppressed"
+    assert dmx.frames_suppressed == 1, "Suppressed frame should be counted"
+    
+    dmx.set_channel(1, 255)
+    assert dmx.send_dmx(), "Changed frame should be sent"
+    assert dmx.serial.last_write[5] == 255, "Changed data should be on the wire"
+    
+    # After the keepalive interval the unchanged frame goes out again
+    time.sleep(0.15)
+    assert dmx.send_dmx(), "Unchanged frame should be resent after keepalive"
+    assert dmx.frames_sent == 3, f"Expected 3 frames sent, got {dmx.frames_sent}"
+    
+    dmx.close()
+    print("✓ Send on change test passed")
+
+
+def test_trimmed_frames():
+    """Test sending only up to the highest patched channel."""
+    print("\n--- Test 11: Trimmed Frames ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0', trim=True)
+    
+    # Nothing patched yet: the DMX minimum of 24 slots applies
+    dmx.send_dmx()
+    sent = dmx.serial.last_write
+    assert len(sent) == 5 + 24 + 1, f"Expected a 24-slot frame, got {len(sent) - 6} slots"
+    assert sent[2] == 25 and sent[3] == 0, "Length field should be start code + 24 slots"
+    assert sent[-1] == 0xE7, "Trimmed packet should end with END_MSG"
+    
+    # A fixture at 30-35 extends the frame to 35 slots
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=30)
+    par.set_dimmer(255)
+    dmx.send_dmx()
+    sent = dmx.serial.last_write
+    assert len(sent) == 5 + 35 + 1, f"Expected a 35-slot frame, got {len(sent) - 6} slots"
+    assert sent[5 + 29] == 255, "Channel 30 should be in the frame"
+    assert dmx.max_frame_rate() > 500, "Short frames should allow a high refresh rate"
+    
+    # Full universe timing matches the DMX512 maximum of ~44 fps
+    rate = dmx_strobe.dmx_max_frame_rate(512)
+    assert 43 < rate < 45, f"512-slot frames should allow ~44 fps, got {rate:.1f}"
+    
+    dmx.close()
+    print("✓ Trimmed frames test passed")
+
+
+def test_widget_parameters():
+    """Test reading and setting Enttec widget parameters."""
+    print("\n--- Test 12: Widget Parameters ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    
+    # Queue a label 3 reply: firmware 0x0144, break 9 units, MAB 1 unit, 40 fps
+    dmx.serial.read_buffer += bytes([0x7E, 0x03, 0x05, 0x00, 0x44, 0x01, 9, 1, 40, 0xE7])
+    params = dmx.get_widget_parameters()
+    assert dmx.serial.last_write == bytes([0x7E, 0x03, 0x02, 0x00, 0x00, 0x00, 0xE7]), \
+        "Get request should be label 3 with a zero user config size"
+    assert params['firmware'] == 0x0144, "Firmware version should be parsed"
+    assert abs(params['break_us'] - 96) < 1, "Break should be 9 units of 10.67us"
+    assert params['rate'] == 40, "Output rate should be parsed"
+    
+    # Set the fastest timing the widget allows
+    dmx.set_widget_parameters(break_us=96, mab_us=11, rate=0)
+    assert dmx.serial.last_write == bytes([0x7E, 0x04, 0x05, 0x00, 0, 0, 9, 1, 0, 0xE7]), \
+        "Set request should be label 4 with break, MAB and rate"
+    assert dmx.max_frame_rate() > 44, "Shorter break should raise the refresh rate"
+    
+    try:
+        dmx.set_widget_parameters(break_us=50)
+        assert False, "Break below 96us should be rejected"
+    except ValueError:
+        pass
+    
+    dmx.close()
+    print("✓ Widget parameters test passed")
+
+
+def test_deadline_scheduler():
+    """Test drift-free deadline scheduling."""
+    print("\n--- Test 13: Deadline Scheduler ---")
+    
+    # Work inside the loop must not add up on top of the period
+    scheduler = dmx_strobe.DeadlineScheduler(0.01, spin=0.001)
+    for _ in range(20):
+        time.sleep(0.004)  # simulated frame building + serial write
+        scheduler.wait_next()
+    elapsed = scheduler.elapsed
+    assert 0.19 <= elapsed <= 0.23, f"20 ticks of 10ms should take ~0.2s, took {elapsed:.3f}s"
+    assert scheduler.lateness.max < 0.01, "Deadlines should be hit within a period"
+    
+    # Work longer than a period is reported as an overrun and skipped ticks
+    scheduler = dmx_strobe.DeadlineScheduler(0.01)
+    scheduler.start_ns -= 35_000_000  # as if 35ms of work had just run
+    scheduler.next_ns = scheduler.start_ns
+    scheduler.wait_next()
+    stats = scheduler.stats()
+    assert stats['overruns'] == 1, "Late deadline should count as an overrun"
+    assert stats['skipped'] == 2, f"Expected 2 skipped ticks, got {stats['skipped']}"
+    
+    print(f"✓ Deadline scheduler test passed (lateness {scheduler.lateness})")
+
+
+def test_strobe_engine():
+    """Test merged strobe schedule for many fixtures."""
+    print("\n--- Test 14: Strobe Engine ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    
+    # One par at 8 Hz, 50% duty: 15 flips in the first second
+    single = dmx_strobe.StrobeEngine(dmx)
+    single.add(dmx_strobe.BeamZLEDPar(dmx, start_channel=1), frequency=8)
+    single_frames = len(list(single.schedule(1.0)))
+    assert single_frames == 15, f"Expected 15 flips in 1s at 8 Hz, got {single_frames}"
+    
+    # 40 pars in sync, half of them in anti-phase: still one frame per flip
+    pars = [dmx_strobe.BeamZLEDPar(dmx, start_channel=1 + 6 * i) for i in range(40)]
+    engine = dmx_strobe.StrobeEngine(dmx)
+    for i, par in enumerate(pars):
+        engine.add(par, frequency=8, phase=0.5 if i % 2 else 0.0)
+    schedule = list(engine.schedule(1.0))
+    assert len(schedule) == single_frames, f"40 pars should cost {single_frames} frames, got {len(schedule)}"
+    assert all(len(changes) == 40 for _, changes in schedule), "Every par should flip in each frame"
+    
+    # Different frequencies and duty cycles merge into one schedule
+    engine = dmx_strobe.StrobeEngine(dmx)
+    engine.add(pars[0], frequency=10, duty_cycle=0.2)
+    engine.add(pars[1], frequency=5, duty_cycle=0.5)
+    times = [t for t, _ in engine.schedule(0.2)]
+    assert times == sorted(times), "Schedule should be in time order"
+    assert times == [0.02, 0.1, 0.12], f"Unexpected merged schedule {times}"
+    
+    # Running leaves the fixtures off
+    stats = engine.run(0.2)
+    assert stats['frames'] == 4, f"Expected initial frame + 3 flips, got {stats['frames']}"
+    assert dmx.dmx_data[0] == 0 and dmx.dmx_data[6] == 0, "Fixtures should be off after the strobe"
+    
+    dmx.close()
+    print("✓ Strobe engine test passed")
+
+
+def test_strobe_calibration():
+    """Test hardware strobe calibration and selection."""
+    print("\n--- Test 15: Strobe Calibration ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    
+    # Simulated fixture: flash rate rises linearly from 1 Hz to 20 Hz
+    def measure(value):
+        assert dmx.dmx_data[4] == value, "Strobe channel should be set while measuring"
+        return 1.0 + 19.0 * (value - 1) / 254
+    
+    calibration = dmx_strobe.calibrate_strobe(dmx, par, measure)
+    value, error = calibration.value_for(8.0)
+    assert abs(calibration.hz_for(value) - 8.0) < 0.1, "Calibrated value should give ~8 Hz"
+    assert error < 0.01, f"Interpolation error should be small, got {error:.3f}"
+    
+    # Stored per profile and loaded back
+    path = os.path.join(tempfile.mkdtemp(), 'calibration.json')
+    calibration.save(path)
+    loaded = dmx_strobe.StrobeCalibration.load(par.PROFILE, path)
+    assert loaded.points == calibration.points, "Loaded calibration should match"
+    assert dmx_strobe.StrobeCalibration.load('unknown', path) is None, "Unknown profile should load as None"
+    
+    # Reachable frequency strobes in hardware: no frames scheduled
+    engine = dmx_strobe.StrobeEngine(dmx)
+    assert engine.add(par, frequency=8, calibration=loaded) == 'hardware', "8 Hz should use hardware strobe"
+    assert engine.add(par, frequency=50, calibration=loaded) == 'software', "50 Hz is out of hardware range"
+    
+    # Hardware strobe can't reproduce phase or duty cycle, so those stay in software
+    assert engine.add(par, frequency=8, phase=0.5, calibration=loaded) == 'software', \
+        "Phase offset should use software strobe"
+    assert engine.add(par, frequency=8, duty_cycle=0.1, calibration=loaded) == 'software', \
+        "Short duty cycle should use software strobe"
+    assert engine.add(par, frequency=8, duty_cycle=0.1, calibration=loaded, hardware=True) == 'hardware', \
+        "Explicit opt-in should use hardware strobe"
+    assert engine.add(par, frequency=8, calibration=loaded, hardware=False) == 'software', \
+        "Opt-out should use software strobe"
+    engine.strobes.clear()
+    assert list(engine.schedule(1.0)) == [], "Hardware strobe should need no flips"
+    
+    # Record the strobe channel in every frame sent
+    sent_strobe = []
+    send_dmx = dmx.send_dmx
+    dmx.send_dmx = lambda: (sent_strobe.append(dmx.dmx_data[4]), send_dmx())[1]
+    stats = engine.run(0.05)
+    dmx.send_dmx = send_dmx
+    assert stats['frames'] == 1, "Hardware strobe should need only the initial frame"
+    assert sent_strobe == [value, 0], f"Expected strobe on then off, got {sent_strobe}"
+    assert dmx.dmx_data[4] == 0, "Strobe channel should be off afterwards"
+    
+    dmx.close()
+    print(f"✓ Strobe calibration test passed (8 Hz -> value {value})")
+
+
+def test_snapshots():
+    """Test named snapshots encoded once and written as is."""
+    print("\n--- Test 16: Snapshots ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    
+    # Named snapshots are encoded when defined and restore the universe
+    par.white_full()
+    dmx.define_snapshot('white')
+    dmx.blackout()
+    assert not any(dmx.dmx_data), "Blackout snapshot should clear the universe"
+    dmx.send_snapshot('white')
+    assert dmx.dmx_data[1] == 255, "Snapshot should be loaded into the universe"
+    assert dmx.serial.last_write == dmx._snapshots['white'][2], "Pre-encoded snapshot should be written"
+    
+    # Defining a snapshot leaves the packet being sent alone, even at another frame length
+    dmx.send_dmx()
+    packet = bytes(dmx._packet)
+    par.set_rgb(1, 2, 3)
+    dmx.trim = True
+    dmx.define_snapshot('red')
+    dmx.trim = False
+    assert bytes(dmx._packet) == packet, "Snapshot should be encoded outside the persistent packet"
+    assert len(dmx._snapshots['red'][2]) == 6 + dmx_strobe.DMX_MIN_SLOTS, "Snapshot should be trimmed"
+    
+    # The strobe alternates between two snapshots
+    for _ in range(4):
+        dmx.send_snapshot('white')
+        assert dmx.serial.last_write[5] == 255, "White snapshot should be sent"
+        dmx.blackout()
+        assert dmx.serial.last_write[5] == 0, "Blackout snapshot should be sent"
+    
+    dmx.close()
+    print("✓ Snapshot test passed")
+
+
+def test_bulk_channels():
+    """Test batch and scatter channel writes."""
+    print("\n--- Test 17: Bulk Channel Writes ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    
+    # Consecutive channels from a list, with clamping
+    dmx.set_channels(10, [0, 128, 300, -5])
+    assert list(dmx.dmx_data[9:13]) == [0, 128, 255, 0], "Values should be written and clamped"
+    
+    # Bytes are written as-is, up to channel 512
+    dmx.set_channels(509, b'\x01\x02\x03\x04')
+    assert list(dmx.dmx_data[508:512]) == [1, 2, 3, 4], "Bytes should be copied directly"
+    
+    try:
+        dmx.set_channels(510, [1, 2, 3, 4])
+        assert False, "Batch past channel 512 should be rejected"
+    except ValueError:
+        pass
+    
+    # A scalar is not a batch (bytes(5) would be five zeros)
+    before = bytes(dmx.dmx_data)
+    for values in (5, iter([1, 2])):
+        try:
+            dmx.set_channels(1, values)
+            assert False, f"{type(values).__name__} values should be rejected"
+        except TypeError:
+            pass
+    assert bytes(dmx.dmx_data) == before, "Rejected values should not be written"
+    
+    # Scattered channels
+    dmx.set_channels_at([1, 100, 512], [7, 999, 9])
+    assert (dmx.dmx_data[0], dmx.dmx_data[99], dmx.dmx_data[511]) == (7, 255, 9), \
+        "Scatter write should set and clamp each channel"
+    
+    try:
+        dmx.set_channels_at([0, 5], [1, 2])
+        assert False, "Channel 0 should be rejected"
+    except ValueError:
+        pass
+    
+    if dmx_strobe.numpy is not None:
+        np = dmx_strobe.numpy
+        dmx.set_channels(20, np.array([-1.0, 127.6, 400.0]))
+        assert list(dmx.dmx_data[19:22]) == [0, 127, 255], "NumPy values should be clamped"
+        dmx.set_channels_at(np.array([30, 40]), np.array([5, 6]))
+        assert dmx.dmx_data[29] == 5 and dmx.dmx_data[39] == 6, "NumPy scatter write should set channels"
+    
+    dmx.close()
+    print("✓ Bulk channel writes test passed")
+
+
+def test_frame_transaction():
+    """Test atomic frame transactions."""
+    print("\n--- Test 18: Frame Transaction ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    
+    # Writes and send_dmx calls inside the block result in one send at the end
+    count = dmx.serial.write_count
+    with dmx.frame():
+        par.set_dimmer(255)
+        dmx.send_dmx()
+        with dmx.frame():
+            par.set_rgb(255, 0, 0)
+        dmx.send_dmx()
+        assert dmx.serial.write_count == count, "Nothing should be sent inside a frame"
+    assert dmx.serial.write_count == count + 1, "Exactly one frame should be sent"
+    assert dmx.serial.last_write[5:9] == bytes([255, 255, 0, 0]), "Frame should carry all writes"
+    
+    # A failed transaction sends nothing
+    try:
+        with dmx.frame():
+            par.set_rgb(0, 0, 255)
+            raise RuntimeError("effect failed")
+    except RuntimeError:
+        pass
+    assert dmx.serial.write_count == count + 1, "Failed frame should not be sent"
+    
+    # With the output thread, the frame is committed atomically
+    dmx.start_output(rate=200)
+    time.sleep(0.02)
+    published = dmx.serial.last_write[6:9]
+    with dmx.frame():
+        par.set_rgb(0, 255, 0)
+        time.sleep(0.02)
+        assert dmx.serial.last_write[6:9] == published, "Half-written frame should not be sent"
+    time.sleep(0.02)
+    assert dmx.serial.last_write[6:9] == bytes([0, 255, 0]), "Committed frame should be sent"
+    dmx.stop_output()
+    
+    dmx.close()
+    print("✓ Frame transaction test passed")
+
+
+def test_universe_manager():
+    """Test rendering and flushing several universes in parallel."""
+    print("\n--- Test 19: Universe Manager ---")
+    manager = dmx_strobe.UniverseManager()
+    for universe_id in range(1, 5):
+        manager.add(universe_id, port=f'/dev/ttyUSB{universe_id - 1}')
+    
+    # Every write blocks for 20ms, like a slow USB adapter
+    for output in manager.universes.values():
+        write = output.serial.write
+        output.serial.write = lambda data, write=write: (time.sleep(0.02), write(data))[1]
+    
+    def render(universes):
+        for universe_id, output in universes.universes.items():
+            output.set_channel(1, universe_id * 10)
+    
+    start = time.perf_counter()
+    manager.tick(render)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.06, f"4 parallel 20ms writes should take ~20ms, took {elapsed * 1e3:.0f}ms"
+    for universe_id, output in manager.universes.items():
+        assert output.serial.last_write[5] == universe_id * 10, f"Universe {universe_id} should be sent"
+    
+    stats = manager.stats()
+    assert stats['universes'][3]['count'] == 1, "Each universe should record its write"
+    assert stats['universes'][3]['last'] >= 0.02, "Write time should include the blocking write"
+    assert stats['flush']['count'] == 1, "Flush should be timed"
+    
+    try:
+        manager.add(1, port='/dev/ttyUSB9')
+        assert False, "Duplicate universe IDs should be rejected"
+    except ValueError:
+        pass
+    
+    manager.close()
+    print(f"✓ Universe manager test passed (tick {elapsed * 1e3:.0f}ms)")
+
+
+def test_async_output():
+    """Test non-blocking asyncio output with back-pressure."""
+    print("\n--- Test 20: Async Output ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    
+    writes = dmx.write_stats.count
+    
+    def fill():
+        """Fill the pipe so the port looks busy; returns the bytes written."""
+        filler = 0
+        try:
+            while True:
+                filler += os.write(write_fd, b'x' * 4096)
+        except BlockingIOError:
+            return filler
+    
+    async def scenario():
+        transport = dmx.open_async(write_fd)
+        filler = fill()
+        
+        # First frame waits in flight; second is replaced by the third
+        sends = []
+        for value in (1, 2, 3):
+            dmx.set_channel(1, value)
+            sends.append(asyncio.ensure_future(dmx.send_dmx_async()))
+            await asyncio.sleep(0)
+        assert not any(send.done() for send in sends), "Sends should wait for the busy port"
+        assert not dmx._write_lock.locked(), "Write lock should not be held while waiting for the port"
+        
+        # Drain the pipe from the event loop until every send has resolved
+        received = bytearray()
+        while not all(send.done() for send in sends):
+            try:
+                received += os.read(read_fd, 65536)
+            except BlockingIOError:
+                pass
+            await asyncio.sleep(0.001)
+        try:
+            received += os.read(read_fd, 65536)
+        except BlockingIOError:
+            pass
+        return [send.result() for send in sends], transport, bytes(received[filler:])
+    
+    results, transport, frames = asyncio.run(scenario())
+    assert results == [True, False, True], f"Expected newest frame to replace the queued one, got {results}"
+    assert transport.frames_dropped == 1, "Replaced frame should count as dropped"
+    assert len(frames) == 2 * 518, f"Expected 2 complete packets, got {len(frames)} bytes"
+    assert frames[5] == 1 and frames[518 + 5] == 3, "Frames 1 and 3 should be written in order"
+    assert dmx.write_stats.count == writes + 2, "Async writes should be timed like blocking ones"
+    
+    # Async strobe runs as a coroutine
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    dmx.open_async(write_fd)
+    stats = asyncio.run(dmx_strobe.strobe_8hz_async(dmx, par, duration=0.3))
+    assert stats['frames'] == 5, f"Expected initial frame + 4 flips in 0.3s, got {stats['frames']}"
+    assert dmx.dmx_data[0] == 0, "Light should be off after the async strobe"
+    
+    # close() on the loop thread with a packet in flight finishes that packet
+    # (the widget drains the port on its own) instead of deadlocking the loop
+    received = bytearray()
+    draining = threading.Event()
+    def drain():
+        while draining.is_set():
+            if select.select([read_fd], [], [], 0.01)[0]:
+                received.extend(os.read(read_fd, 65536))
+    
+    async def close_in_flight():
+        while select.select([read_fd], [], [], 0)[0]:
+            os.read(read_fd, 65536)  # strobe frames left in the pipe
+        filler = fill()
+        dmx.set_channel(1, 42)
+        send = asyncio.ensure_future(dmx.send_dmx_async())
+        await asyncio.sleep(0)
+        assert not send.done(), "Send should wait for the busy port"
+        draining.set()
+        thread = threading.Thread(target=drain, daemon=True)
+        thread.start()
+        dmx.close()
+        result = await asyncio.wait_for(send, timeout=1)
+        draining.clear()
+        thread.join()
+        while select.select([read_fd], [], [], 0)[0]:
+            received.extend(os.read(read_fd, 65536))
+        return filler, result
+    
+    filler, result = asyncio.run(close_in_flight())
+    assert result, "Packet in flight should complete"
+    assert len(received) - filler == 518 and received[filler + 5] == 42, "Packet in flight should be whole"
+    assert dmx.serial.last_write[5] == 0, "Close should still black out after it"
+    
+    os.close(read_fd)
+    os.close(write_fd)
+    print("✓ Async output test passed")
+
+
+def test_artnet_output():
+    """Test Art-Net output against a loopback UDP receiver."""
+    print("\n--- Test 21: Art-Net Output ---")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(1)
+    port = receiver.getsockname()[1]
+    
+    artnet = dmx_strobe.ArtNetOutput(universe=0x1203, host='127.0.0.1', port=port)
+    assert isinstance(artnet, dmx_strobe.DMXOutput), "Art-Net should share the output interface"
+    
+    # Fixtures and effects drive it unchanged
+    par = dmx_strobe.BeamZLEDPar(artnet, start_channel=1)
+    par.white_full()
+    artnet.send_dmx()
+    packet = receiver.recv(1024)
+    assert packet[:8] == b'Art-Net\x00', "Packet should start with the Art-Net ID"
+    assert packet[8:10] == bytes([0x00, 0x50]), "OpCode should be ArtDmx (0x5000 little-endian)"
+    assert packet[10:12] == bytes([0, 14]), "Protocol version should be 14"
+    assert packet[12] == 1, "First packet should have sequence 1"
+    assert packet[14] == 0x03 and packet[15] == 0x12, "SubUni and Net should encode the universe"
+    assert packet[16:18] == bytes([0x02, 0x00]), "Length should be 512 (big-endian)"
+    assert packet[18:24] == bytes([255, 255, 255, 255, 0, 0]), "Channel data should follow the header"
+    
+    par.blackout()
+    artnet.send_dmx()
+    packet = receiver.recv(1024)
+    assert packet[12] == 2, "Sequence should increment"
+    assert packet[18] == 0, "Blackout should be sent"
+    
+    # Trimmed frames round up to an even length
+    artnet.trim = True
+    artnet.patch(1, 25)
+    artnet.send_dmx()
+    packet = receiver.recv(1024)
+    assert packet[16:18] == bytes([0, 26]), "Trimmed length should be even"
+    assert len(packet) == 18 + 26, "Packet should carry 26 slots"
+    
+    # Strobe engine runs on Art-Net too
+    engine = dmx_strobe.StrobeEngine(artnet)
+    engine.add(par, frequency=8)
+    frames = engine.run(0.2)['frames']
+    
+    artnet.close()
+    receiver.close()
+    print(f"✓ Art-Net output test passed ({frames} strobe frames)")
+
+
+def test_sacn_output():
+    """Test sACN (E1.31) output and universe sync on loopback."""
+    print("\n--- Test 22: sACN Output ---")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(1)
+    port = receiver.getsockname()[1]
+    
+    assert dmx_strobe.sacn_multicast_address(0x0102) == '239.255.1.2', "Multicast group should encode the universe"
+    
+    sender = dmx_strobe.SACNSender(source_name='test', sync_universe=7000, host='127.0.0.1', port=port)
+    outputs = [sender.add_universe(universe, priority=150) for universe in (1, 2)]
+    par = dmx_strobe.BeamZLEDPar(outputs[1], start_channel=1)
+    par.white_full()
+    sender.flush()
+    
+    first, second, sync = receiver.recv(1024), receiver.recv(1024), receiver.recv(1024)
+    assert len(first) == 126 + 512, "Full universe packet should be 638 bytes"
+    assert first[4:16] == b'ASC-E1.17\x00\x00\x00', "Root layer should carry the ACN identifier"
+    assert first[16:18] == bytes([0x72, 0x6E]), "Root PDU length should be 622"
+    assert first[22:38] == sender.cid, "Packets should carry the sender's CID"
+    assert first[44:48] == b'test', "Source name should be set"
+    assert first[108] == 150, "Priority should be set"
+    assert first[109:111] == (7000).to_bytes(2, 'big'), "Sync address should be set"
+    assert first[111] == 1, "First packet should have sequence 1"
+    assert first[113:115] == bytes([0, 1]) and second[113:115] == bytes([0, 2]), "Universes should be set"
+    assert first[123:125] == bytes([0x02, 0x01]), "Property count should be start code + 512"
+    assert first[125] == 0 and second[126] == 255, "Start code then channel data"
+    
+    assert len(sync) == 49, "Sync packet should be 49 bytes"
+    assert sync[18:22] == bytes([0, 0, 0, 8]), "Sync should use the extended root vector"
+    assert sync[40:44] == bytes([0, 0, 0, 1]), "Sync should use the synchronization vector"
+    assert sync[45:47] == (7000).to_bytes(2, 'big'), "Sync packet should name the sync universe"
+    
+    # Trimmed frames patch the PDU lengths
+    outputs[0].trim = True
+    outputs[0].send_dmx()
+    packet = receiver.recv(1024)
+    assert len(packet) == 126 + 24, "Trimmed packet should carry 24 slots"
+    assert packet[115:117] == (0x7000 | (150 - 115)).to_bytes(2, 'big'), "DMP length should match"
+    assert packet[111] == 2, "Sequence should increment per universe"
+    
+    # Closing blacks out and sends three stream-terminated packets per universe
+    sender.close()
+    packets = [receiver.recv(1024) for _ in range(9)]
+    terminated = [p for p in packets if len(p) > 49 and p[112] & 0x40]
+    assert len(terminated) == 6, f"Expected 3 terminated packets per universe, got {len(terminated)}"
+    
+    receiver.close()
+    print("✓ sACN output test passed")
+
+
+def test_network_bridge():
+    """Test forwarding Art-Net and sACN to a USB widget, with burst coalescing."""
+    print("\n--- Test 23: Network Bridge ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    bridge = dmx_strobe.DMXBridge('artnet', bind='127.0.0.1', port=0)
+    bridge.map(0x0102, dmx, rate=2)
+    
+    artnet = dmx_strobe.ArtNetOutput(universe=0x0102, host='127.0.0.1', port=bridge.address[1])
+    other = dmx_strobe.ArtNetOutput(universe=5, host='127.0.0.1', port=bridge.address[1])
+    artnet.set_channels(1, [10, 20, 30])
+    artnet.send_dmx()
+    assert bridge.poll(timeout=1), "Mapped universe should be forwarded"
+    assert dmx.dmx_data[:3] == bytes([10, 20, 30]), "Payload should land in the output universe"
+    assert dmx.serial.last_write[5:8] == bytes([10, 20, 30]), "First packet should be written at once"
+    
+    # A burst within one frame interval is coalesced to the newest data
+    writes = dmx.serial.write_count
+    for value in (40, 50, 60):
+        artnet.set_channel(1, value)
+        artnet.send_dmx()
+        bridge.poll(timeout=1)
+    assert dmx.serial.write_count == writes, "Burst should wait for the frame interval"
+    assert bridge.packets_coalesced == 2, "Later burst packets should be coalesced"
+    bridge.poll(timeout=1)
+    assert dmx.serial.write_count == writes + 1, "Coalesced frame should be written when due"
+    assert dmx.serial.last_write[5] == 60, "Newest data should win"
+    
+    # Unmapped universes are ignored
+    other.send_dmx()
+    assert not bridge.poll(timeout=1), "Unmapped universe should not be forwarded"
+    stats = bridge.stats()
+    assert stats['ignored'] == 1, "Ignored packet should be counted"
+    assert stats['latency'][0x0102]['count'] == 2, "Each write should record its latency"
+    bridge.close()
+    artnet.close()
+    other.close()
+    
+    # sACN: same path, E1.31 parsing
+    bridge = dmx_strobe.DMXBridge('sacn', bind='127.0.0.1', port=0)
+    bridge.map(1, dmx)
+    sender = dmx_strobe.SACNSender(host='127.0.0.1', port=bridge.address[1])
+    universe = sender.add_universe(1)
+    universe.set_channels(1, [1, 2, 3, 4])
+    universe.send_dmx()
+    assert bridge.poll(timeout=1), "sACN universe should be forwarded"
+    assert dmx.dmx_data[:4] == bytes([1, 2, 3, 4]), "sACN payload should land in the output universe"
+    
+    print(f"✓ Network bridge test passed (latency {bridge.latency[1]})")
+    sender.socket.close()
+    bridge.close()
+    dmx.close()
+
+
+def test_low_latency_writes():
+    """Test the raw fd write path, write timing and low-latency setup."""
+    print("\n--- Test 24: Low-Latency Writes ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    dmx.set_channel(1, 255)
+    dmx.send_dmx()
+    assert dmx.write_stats.count == 1, "Every write should be timed"
+    
+    # Raw writes go straight to the file descriptor
+    read_fd, write_fd = os.pipe()
+    dmx.enable_raw_write(fd=write_fd)
+    writes = dmx.serial.write_count
+    dmx.send_dmx()
+    packet = os.read(read_fd, 1024)
+    assert dmx.serial.write_count == writes, "Raw writes should bypass pyserial"
+    assert packet[:6] == bytes([0x7E, 0x06, 0x01, 0x02, 0x00, 255]), "Raw write should carry the packet"
+    assert len(packet) == 518, "Whole packet should be written"
+    assert dmx.write_stats.count == 2, "Raw writes should be timed too"
+    
+    # Without an FTDI device both steps are skipped, not fatal
+    result = dmx.set_low_latency()
+    assert result == {'latency_timer': None, 'async_low_latency': False}, "Missing device should be reported"
+    
+    print(f"✓ Low-latency write test passed (writes {dmx.write_stats})")
+    dmx.close()
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_port_discovery():
+    """Test widget serial numbers, discovery and the cached port lookup."""
+    print("\n--- Test 25: Port Discovery ---")
+    assert os.path.dirname(dmx_strobe.WIDGET_STATE_FILE) == os.path.dirname(os.path.abspath(dmx_strobe.__file__)), \
+        "Default cache should sit next to the script, not in the working directory"
+    with tempfile.TemporaryDirectory() as directory:
+        state_file = os.path.join(directory, 'widgets.json')
+        port = os.path.join(directory, 'ttyUSB1')  # must exist to be trusted from the cache
+        open(port, 'w').close()
+        MockSerial.serial_numbers = {port: bytes([0x78, 0x56, 0x34, 0x12])}
+        
+        dmx = dmx_strobe.DMXUSB(port=port)
+        assert dmx.get_serial_number() == '12345678', "Serial number should be decoded from BCD"
+        dmx.close()
+        
+        widgets = dmx_strobe.discover_widgets(state_file, ports=['/dev/ttyUSB0', port])
+        assert widgets == {'12345678': port}, "Only the answering port should be found"
+        assert os.path.exists(state_file), "Discovery should be cached"
+        
+        # Cached port is used without probing other ports
+        start = time.perf_counter()
+        assert dmx_strobe.find_widget('12345678', state_file, ports=[]) == port, "Cached port should be found"
+        assert dmx_strobe.find_widget(state_file=state_file, ports=[]) == port, "Any cached widget should do"
+        elapsed = time.perf_counter() - start
+        
+        # A widget that moved is found again by a full probe
+        MockSerial.serial_numbers = {'/dev/ttyUSB2': bytes([0x78, 0x56, 0x34, 0x12])}
+        assert dmx_strobe.find_widget('12345678', state_file, ports=['/dev/ttyUSB2']) == '/dev/ttyUSB2', \
+            "Moved widget should be rediscovered"
+        assert dmx_strobe.find_widget('99999999', state_file, ports=[]) is None, "Unknown widget should not be found"
+        
+        # A corrupt or unwritable cache is a miss, not a crash
+        with open(state_file, 'w') as f:
+            f.write('{not json')
+        assert dmx_strobe.find_widget('12345678', state_file, ports=['/dev/ttyUSB2']) == '/dev/ttyUSB2', \
+            "Corrupt cache should fall back to probing"
+        unwritable = os.path.join(directory, 'missing', 'widgets.json')
+        assert dmx_strobe.find_widget('12345678', unwritable, ports=['/dev/ttyUSB2']) == '/dev/ttyUSB2', \
+            "Unwritable cache should not stop discovery"
+        MockSerial.serial_numbers = {}
+    
+    # Only widget-like by-id links are probed (opening an Arduino resets it)
+    with tempfile.TemporaryDirectory() as directory:
+        names = ['usb-Arduino__www.arduino.cc__0043_7543-if00',
+                 'usb-FTDI_FT232R_USB_UART_A5047ZZB-if00-port0']
+        for name in names:
+            open(os.path.join(directory, name), 'w').close()
+        by_id_dir, dmx_strobe.SERIAL_BY_ID_DIR = dmx_strobe.SERIAL_BY_ID_DIR, directory
+        try:
+            ports = dmx_strobe.candidate_ports()
+        finally:
+            dmx_strobe.SERIAL_BY_ID_DIR = by_id_dir
+        assert os.path.join(directory, names[1]) in ports, "FTDI link should be a candidate"
+        assert os.path.join(directory, names[0]) not in ports, "Other devices should not be probed"
+    
+    # A device that streams other data is given up on instead of read forever
+    class ChattyPort:
+        def read(self, size=1):
+            return b'$' * size
+    start = time.monotonic()
+    try:
+        dmx_strobe._read_enttec_message(ChattyPort(), 10)
+        assert False, "Non-Enttec stream should be rejected"
+    except ValueError:
+        pass
+    try:
+        dmx_strobe._read_enttec_message(ChattyPort(), 10, timeout=0.05, max_skip=float('inf'))
+        assert False, "Reading should stop at the deadline"
+    except TimeoutError:
+        pass
+    assert time.monotonic() - start < 1, "Reply wait should be bounded"
+    
+    print(f"✓ Port discovery test passed (cached lookup {elapsed * 1e3:.2f}ms)")
+
+
+def wait_for(condition, timeout=2.0):
+    """Poll condition until it holds or timeout seconds pass."""
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_reconnect():
+    """Test that a missing or failing widget is reconnected without stopping effects."""
+    print("\n--- Test 26: Reconnect ---")
+    
+    # Missing at startup: no exit, frames are dropped while rendering continues
+    MockSerial.unplugged = {'/dev/ttyUSB9'}
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB9', reconnect=True, reconnect_delay=0.01)
+    assert not dmx.connected, "Widget should start disconnected"
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    par.white_full()
+    dmx.send_dmx()
+    assert dmx.frames_dropped >= 1, "Frames should be dropped while disconnected"
+    
+    # Plugged in: reconnects in the background and sends the current state at once
+    MockSerial.unplugged = set()
+    assert wait_for(lambda: dmx.connected and dmx.serial.write_count), "Widget should reconnect"
+    assert dmx.serial.last_write[5:11] == dmx_strobe.BeamZLEDPar.WHITE_FULL, "Current state should be resent"
+    
+    # Write failure mid-show: the effect keeps running
+    def unplug(data):
+        MockSerial.unplugged = {'/dev/ttyUSB9'}
+        raise OSError("[MOCK] device disconnected")
+    dmx.serial.write = unplug
+    stats = dmx_strobe.strobe_8hz(dmx, par, duration=0.2)
+    assert stats is not None, "Strobe should finish despite the failure"
+    assert dmx.disconnects == 1, "Disconnect should be counted"
+    assert not dmx.connected, "Widget should be disconnected"
+    
+    par.set_rgb(1, 2, 3)
+    dmx.send_dmx()
+    MockSerial.unplugged = set()
+    assert wait_for(lambda: dmx.connected and dmx.serial.write_count), "Widget should reconnect again"
+    assert dmx.serial.last_write[6:9] == bytes([1, 2, 3]), "Latest state should be resent"
+    dropped = dmx.frames_dropped
+    dmx.close()
+    
+    # Configuring the reopened port fails once (Mk2 API key): counts as a failed open and is retried
+    dmx = dmx_strobe.DMXUSBMk2(port='/dev/ttyUSB9', reconnect=True, reconnect_delay=0.01)
+    activate_port2 = dmx.activate_port2
+    failures = []
+    def fail_once():
+        if not failures:
+            failures.append(True)
+            raise OSError("[MOCK] write failed while configuring")
+        activate_port2()
+    dmx.activate_port2 = fail_once
+    dmx.serial.write = unplug
+    dmx.send_dmx()
+    MockSerial.unplugged = set()
+    assert wait_for(lambda: failures and dmx.connected and dmx.serial.write_count), "Mk2 should reconnect after the retry"
+    assert dmx.serial.writes[0][1] == 0x0D, "API key should be sent on the retried connection"
+    assert wait_for(lambda: dmx._reconnect_thread is None), "Reconnect thread should be cleared"
+    
+    # ...and a later failure still reconnects
+    dmx.serial.write = unplug
+    dmx.send_dmx()
+    MockSerial.unplugged = set()
+    assert wait_for(lambda: dmx.connected and dmx.disconnects == 2), "Mk2 should reconnect after a second failure"
+    dmx.close()
+    
+    # Without reconnect, write errors still raise
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    dmx.serial.write = unplug
+    try:
+        dmx.send_dmx()
+        assert False, "Write error should raise without reconnect"
+    except OSError:
+        pass
+    MockSerial.unplugged = set()
+    dmx.serial = MockSerial('/dev/ttyUSB0', 115200, 1)
+    dmx.close()
+    
+    print(f"✓ Reconnect test passed ({dropped} frames dropped while disconnected)")
+
+
+def test_redundant_output():
+    """Test mirrored and hot-standby output with failover on error and stall."""
+    print("\n--- Test 27: Redundant Output ---")
+    primary = dmx_strobe.DMXUSB(port='/dev/ttyUSB0', reconnect=True, reconnect_delay=0.01)
+    backup = dmx_strobe.DMXUSB(port='/dev/ttyUSB1', reconnect=True, reconnect_delay=0.01)
+    dmx = dmx_strobe.RedundantOutput(primary, backup)
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    par.white_full()
+    dmx.send_dmx()
+    assert wait_for(lambda: primary.serial.write_count and backup.serial.write_count), "Both widgets should be written"
+    assert primary.serial.last_write == backup.serial.last_write, "Both widgets should get the same packet"
+    assert primary.serial.last_write[5:11] == dmx_strobe.BeamZLEDPar.WHITE_FULL, "Packet should carry the universe"
+    dmx.close()
+    
+    # Hot standby: only the active widget is written until it fails
+    primary = dmx_strobe.DMXUSB(port='/dev/ttyUSB0', reconnect=True, reconnect_delay=0.01)
+    backup = dmx_strobe.DMXUSB(port='/dev/ttyUSB1', reconnect=True, reconnect_delay=0.01)
+    dmx = dmx_strobe.RedundantOutput(primary, backup, mode='standby')
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    dmx.send_dmx()
+    assert primary.serial.write_count == 1 and backup.serial.write_count == 0, "Standby should stay idle"
+    
+    # Write error: the same frame goes to the standby
+    def fail(data):
+        MockSerial.unplugged = {'/dev/ttyUSB0'}
+        raise OSError("[MOCK] device disconnected")
+    primary.serial.write = fail
+    par.set_rgb(1, 2, 3)
+    dmx.send_dmx()
+    assert dmx.active.name == 'backup', "Failed primary should fail over"
+    assert wait_for(lambda: backup.serial.write_count == 1), "Standby should get the failed frame"
+    assert backup.serial.last_write[6:9] == bytes([1, 2, 3]), "Standby should get the same frame"
+    
+    # Reconnected primary gets the current frame, not its own blank universe, and is healthy again
+    MockSerial.unplugged = set()
+    assert wait_for(lambda: primary.connected and primary.serial.write_count), "Primary should reconnect"
+    assert primary.serial.last_write[6:9] == bytes([1, 2, 3]), "Reconnect should push the current frame"
+    assert wait_for(lambda: dmx.stats()['paths']['primary']['healthy']), "Reconnected primary should be healthy"
+    
+    # Stalled write on the backup: fail back to the primary, well under a frame period
+    stalled = threading.Event()
+    def stall(data):
+        stalled.set()
+        time.sleep(0.2)
+    backup.serial.write = stall
+    par.set_rgb(4, 5, 6)
+    start = time.perf_counter()
+    dmx.send_dmx()
+    elapsed = time.perf_counter() - start
+    assert stalled.is_set(), "Backup write should have started before failing over"
+    assert dmx.active.name == 'primary', "Stalled backup should fail back to the primary"
+    assert elapsed < 1 / dmx_strobe.DMXOutput.DEFAULT_OUTPUT_RATE, f"Failover took {elapsed * 1e3:.1f}ms"
+    assert wait_for(lambda: primary.serial.last_write[6:9] == bytes([4, 5, 6])), "Primary should get the stalled frame"
+    
+    # Probe writes keep the standby's health and latency current
+    assert wait_for(lambda: dmx.paths[1].done.is_set()), "Stalled write should finish"
+    dmx.probe_interval = 0
+    probes = backup.write_stats.count
+    par.set_rgb(7, 8, 9)
+    dmx.send_dmx()
+    assert wait_for(lambda: backup.write_stats.count > probes), "Standby should get a probe write"
+    assert wait_for(lambda: dmx.stats()['paths']['backup']['healthy']), "Probed standby should be healthy"
+    
+    stats = dmx.stats()
+    assert stats['failovers'] == 2, "Both failovers should be counted"
+    assert stats['paths']['backup']['latency']['count'] >= 2, "Per-path latency should be recorded"
+    assert stats['paths']['primary']['latency']['count'] >= 3, "Per-path latency should be recorded"
+    dmx.close()
+    print(f"✓ Redundant output test passed (failover in {elapsed * 1e3:.1f}ms)")
+
+
+def test_dmx_input():
+    """Test incremental parsing of received DMX into changed-channel deltas."""
+    print("\n--- Test 28: DMX Input ---")
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    receiver = dmx_strobe.DMXInput(dmx)
+    assert dmx.serial.last_write == bytes([0x7E, 0x08, 1, 0, 1, 0xE7]), "Widget should be set to change-of-state mode"
+    
+    # Full packets (label 5), split across reads byte by byte, with line noise in front
+    universe = bytearray(512)
+    universe[0], universe[99], universe[511] = 255, 7, 1
+    packet = bytes([0x00, 0x00]) + universe  # status, start code, data
+    stream = b'\x00\xff' + dmx_strobe._enttec_message(0x05, packet)
+    updates = [changes for byte in stream for changes in receiver.feed(bytes([byte]))]
+    assert updates == [[(1, 255), (100, 7), (512, 1)]], "Only changed channels should be reported"
+    assert receiver.parser.errors == 2, "Noise bytes should be skipped"
+    
+    # The same packet again changes nothing
+    assert list(receiver.feed(dmx_strobe._enttec_message(0x05, packet))) == [], "Unchanged packet should yield nothing"
+    
+    # Flagged packets are counted and ignored
+    assert list(receiver.feed(dmx_strobe._enttec_message(0x05, bytes([0x02, 0x00]) + bytes(512)))) == []
+    assert receiver.receive_errors == 1, "Overrun packet should be counted"
+    
+    # Change of state (label 9): block 12 covers slots 96-135; bits 4 and 33 -> channels 100, 129
+    mask = (1 << 4 | 1 << 33).to_bytes(5, 'little')
+    message = dmx_strobe._enttec_message(0x09, bytes([12]) + mask + bytes([42, 43]))
+    assert list(receiver.feed(message)) == [[(100, 42), (129, 43)]], "Change-of-state deltas should be decoded"
+    assert receiver.dmx_data[99] == 42 and receiver.dmx_data[128] == 43, "Received universe should be updated"
+    
+    # Blocking generator reads from the port
+    dmx.serial.read_buffer += dmx_strobe._enttec_message(0x09, bytes([0]) + bytes([0b10, 0, 0, 0, 0, 9]))
+    assert next(receiver.changes()) == [(1, 9)], "Generator should yield changes from the port"
+    
+    # Async iterator reads without blocking the loop
+    read_fd, write_fd = os.pipe()
+    
+    async def receive():
+        changes = receiver.changes_async(fd=read_fd)
+        os.write(write_fd, dmx_strobe._enttec_message(0x09, bytes([0]) + bytes([0b100, 0, 0, 0, 0, 5])))
+        update = await asyncio.wait_for(changes.__anext__(), timeout=1)
+        await changes.aclose()
+        return update
+    
+    assert asyncio.run(receive()) == [(2, 5)], "Async iterator should yield changes"
+    os.close(read_fd)
+    os.close(write_fd)
+    dmx.close()
+    print(f"✓ DMX input test passed ({receiver.packets} packets)")
+
+
+def test_mk2_second_port():
+    """Test Mk2 port activation and two independent universes on one widget."""
+    print("\n--- Test 29: Mk2 Second Port ---")
+    dmx = dmx_strobe.DMXUSBMk2(port='/dev/ttyUSB0', send_on_change=True)
+    writes = dmx.serial.writes
+    assert writes[0] == bytes([0x7E, 0x0D, 4, 0, 0xAD, 0x88, 0xD0, 0xC8, 0xE7]), "API key should be sent first"
+    assert writes[1] == bytes([0x7E, 0xCB, 2, 0, 1, 1, 0xE7]), "Both ports should be assigned to DMX"
+    
+    par1 = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    par2 = dmx_strobe.BeamZLEDPar(dmx.port2, start_channel=1)
+    par1.white_full()
+    par2.set_rgb(1, 2, 3)
+    dmx.send_dmx()
+    dmx.port2.send_dmx()
+    assert writes[-2][1] == 0x06 and writes[-2][5:11] == dmx_strobe.BeamZLEDPar.WHITE_FULL, "Port 1 uses label 6"
+    assert writes[-1][1] == 0xA9 and writes[-1][6:9] == bytes([1, 2, 3]), "Port 2 uses its own label and universe"
+    
+    # Independent change tracking: only the changed universe is resent
+    count = dmx.serial.write_count
+    par2.set_rgb(4, 5, 6)
+    assert not dmx.send_dmx(), "Unchanged port 1 should be suppressed"
+    assert dmx.port2.send_dmx(), "Changed port 2 should be sent"
+    assert dmx.serial.write_count == count + 1, "Only port 2 should be written"
+    assert dmx.frames_sent == 1 and dmx.port2.frames_sent == 2, "Frames should be counted per port"
+    
+    # Port 2 has its own non-blocking path on the widget's async transport
+    read_fd, write_fd = os.pipe()
+    dmx.open_async(write_fd)
+    par2.set_rgb(7, 8, 9)
+    assert asyncio.run(dmx.port2.send_dmx_async()), "Port 2 should send asynchronously"
+    packet = os.read(read_fd, 1024)
+    assert packet[1] == 0xA9 and packet[6:9] == bytes([7, 8, 9]), "Async port 2 should use its own label"
+    assert dmx.serial.write_count == count + 1, "Async port 2 should not write through pyserial"
+    assert dmx.port2.frames_sent == 3, "Async port-2 frame should be counted"
+    
+    # Labels and key are configurable
+    custom = dmx_strobe.DMXUSBMk2(port='/dev/ttyUSB1', api_key=b'\x01\x02\x03\x04',
+                                  port_assignment_label=0x90, send_dmx_port2_label=0x91)
+    assert custom.serial.writes[0][4:8] == b'\x01\x02\x03\x04', "Custom key should be sent"
+    assert custom.serial.writes[1][1] == 0x90, "Custom port assignment label should be used"
+    custom.port2.send_dmx()
+    assert custom.serial.last_write[1] == 0x91, "Custom port-2 label should be used"
+    custom.close()
+    
+    dmx.close()
+    assert writes[-2][1] == 0x06 and writes[-1][1] == 0xA9, "Both ports should black out on close"
+    os.close(read_fd)
+    os.close(write_fd)
+    print("✓ Mk2 second port test passed")
+
+
+def test_open_dmx():
+    """Test the Open DMX backend's frame timing and refresh thread."""
+    print("\n--- Test 30: Open DMX ---")
+    dmx = dmx_strobe.OpenDMXUSB(port='/dev/ttyUSB0', break_us=200, mab_us=20)
+    assert dmx.serial.baudrate == 250000, "Open DMX runs at the DMX line rate"
+    
+    # Break condition is toggled around the break, then start code and data are written
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    par.white_full()
+    dmx.send_dmx()
+    assert dmx.serial.breaks == 1 and not dmx.serial.break_condition, "Break should be set then cleared"
+    packet = dmx.serial.last_write
+    assert packet[:7] == bytes([0]) + dmx_strobe.BeamZLEDPar.WHITE_FULL, "Start code then channels"
+    assert len(packet) == 513, "Full universe without Enttec framing"
+    assert dmx.break_stats.min >= 200e-6, "Break should last at least break_us"
+    
+    # Trimmed frames write only the used slots
+    dmx.trim = True
+    dmx.send_dmx()
+    assert len(dmx.serial.last_write) == 1 + dmx_strobe.DMX_MIN_SLOTS, "Trimmed frame should be short"
+    
+    # Refresh thread reports the achieved rate and jitter
+    dmx.start_output(rate=100)
+    time.sleep(0.3)
+    dmx.stop_output()
+    stats = dmx.stats()
+    assert stats['frame_interval']['count'] >= 10, "Frames should be refreshed continuously"
+    assert 50 < stats['fps'] < 150, f"Achieved rate should be near 100 fps, got {stats['fps']:.1f}"
+    assert stats['jitter'] is not None, "Jitter should be reported"
+    dmx.close()
+    print(f"✓ Open DMX test passed ({stats['fps']:.1f} fps, jitter {stats['jitter'] * 1e3:.3f}ms)")
+
+
+def test_enttec_emulator():
+    """Test the PTY widget emulator's decoding and simulated line timing."""
+    print("\n--- Test 31: Enttec Emulator ---")
+    import enttec_emulator
+    emulator = enttec_emulator.EnttecEmulator()
+    frame_ns = emulator.frame_time_ns(512)
+    assert frame_ns == (176 + 12 + 513 * 44) * 1000, "Full frame should take break + MAB + 513 slots"
+    
+    # Simulated line: packets faster than the line wait, and a waiting packet is replaced
+    packet = dmx_strobe._enttec_message(0x06, bytes(513))
+    emulator.feed(packet, 0)
+    emulator.feed(packet, 1000)           # line busy: waits
+    emulator.feed(packet, 2000)           # replaces the waiting packet
+    emulator.feed(packet, 3 * frame_ns)   # line free again
+    starts = [frame[1] for frame in emulator.frames]
+    assert starts == [0, frame_ns, 3 * frame_ns], "Frames should start when the line is free"
+    assert emulator.frames_dropped == 1, "Replaced packet should be dropped"
+    emulator.close()
+    
+    # End to end through the PTY: raw writes from DMXUSB, replies to configuration requests
+    emulator = enttec_emulator.EnttecEmulator()
+    emulator.start()
+    fd = os.open(emulator.port, os.O_RDWR | os.O_NOCTTY)
+    dmx = dmx_strobe.DMXUSB(port='/dev/ttyUSB0')
+    dmx.enable_raw_write(fd=fd)
+    par = dmx_strobe.BeamZLEDPar(dmx, start_channel=1)
+    par.white_full()
+    for _ in range(5):
+        dmx.send_dmx()
+    assert wait_for(lambda: emulator.parser.messages == 5), "Every packet should be decoded"
+    assert emulator.dmx_data[:6] == dmx_strobe.BeamZLEDPar.WHITE_FULL, "Emulator should hold the universe"
+    
+    os.write(fd, dmx_strobe._enttec_message(0x0A))
+    ready = select.select([fd], [], [], 1)[0]
+    assert ready and os.read(fd, 64) == bytes([0x7E, 0x0A, 4, 0, 0x78, 0x56, 0x34, 0x12, 0xE7]), \
+        "Emulator should report its serial number"
+    
+    emulator.stop()
+    stats = emulator.stats()
+    assert stats['frames'] + stats['dropped'] == 5, "Every packet should be sent or dropped"
+    assert stats['latency']['count'] == stats['frames'], "Frames should be timed"
+    dmx.close()
+    os.close(fd)
+    emulator.close()
+    print(f"✓ Enttec emulator test passed ({stats['frames']} frames, {stats['dropped']} dropped)")
+
+
 def main():
     """Run all tests."""
     print("=" * 60)
@@ -164,6 +1350,31 @@ def main():
         test_strobe_timing()
         test_message_format()
         test_multiple_fixtures()
+        test_packet_buffer()
+        test_universe_storage()
+        test_output_thread()
+        test_send_on_change()
+        test_trimmed_frames()
+        test_widget_parameters()
+        test_deadline_scheduler()
+        test_strobe_engine()
+        test_strobe_calibration()
+        test_snapshots()
+        test_bulk_channels()
+        test_frame_transaction()
+        test_universe_manager()
+        test_async_output()
+        test_artnet_output()
+        test_sacn_output()
+        test_network_bridge()
+        test_low_latency_writes()
+        test_port_discovery()
+        test_reconnect()
+        test_redundant_output()
+        test_dmx_input()
+        test_mk2_second_port()
+        test_open_dmx()
+        test_enttec_emulator()
         
         print("\n" + "=" * 60)
         print("✓ All tests passed!")